@@ -1,13 +1,97 @@
+import django
+from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone
 from dateutil.parser import parse
 from datetime import datetime, date
-import statistics
 import numpy as np
 from api.models import CustomerData, InvoiceData
 from django.db.models import Prefetch
-from Sentiment_analysis import get_client_followups
-from typing import Optional, Any, Dict, List, Union
+from Sentiment_analysis import active_followups, get_client_followups
+from typing import Optional, Any, Dict, Iterator, List, Tuple, Union
+import json
 import logging
+import bisect
+import functools
+import itertools
+
+# Aging buckets: a bucket holds overdue days up to and including its upper bound
+OVERDUE_BUCKETS = ("0-30 days", "31-60 days", "61-90 days", "90+ days")
+OVERDUE_BUCKET_BOUNDS = (30, 60, 90)
+
+# InvoiceData columns read by calculate_client_metrics (is_disputed is optional on the model)
+INVOICE_METRIC_FIELDS = (
+    "id", "customer_id", "invoice_number", "project_name", "milestone_name", "currency_type",
+    "invoice_date", "due_date", "invoice_amount", "last_paid_amount", "last_paid_date",
+    "upcoming_payment_date",
+) + (("is_disputed",) if hasattr(InvoiceData, "is_disputed") else ())
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_date_str(date_str: str) -> Optional[date]:
+    """
+    Parse a date string, cached because invoices repeat the same dates.
+    A bare ISO date, or one followed by a "T" or space time part, goes through
+    date.fromisoformat; anything else, or an ISO-looking string it rejects,
+    falls back to dateutil with dayfirst=True.
+    """
+    # ISO dates (Django's serialized form) take the fast path
+    if len(date_str) == 10 or (len(date_str) > 10 and date_str[10] in "T "):
+        try:
+            return date.fromisoformat(date_str[:10])
+        except ValueError:
+            pass
+    try:
+        parsed_date = parse(date_str, dayfirst=True, fuzzy=False)
+        return parsed_date.date() if isinstance(parsed_date, datetime) else parsed_date
+    except (ValueError, TypeError):
+        return None
+
+def _aggregate_invoices(amounts: np.ndarray, received: np.ndarray, due: np.ndarray, last_paid: np.ndarray,
+                        upcoming: np.ndarray, disputed: np.ndarray, today_ord: int) -> Dict[str, Any]:
+    """
+    Numeric pass over a customer's invoice arrays (dates as ordinal days, 0 when missing).
+    Returns per-invoice "receivable", "days_past_due" and "overdue_mask" arrays, the
+    metric counters keyed as in calculate_client_metrics, aging "bucket_counts" /
+    "bucket_amounts", and the "last_payment_ord" / "next_upcoming_ord" dates (0 if none).
+    """
+    receivable = np.maximum(amounts - received, 0.0)
+    has_due = due > 0
+    days_past_due = np.where(has_due, np.maximum(today_ord - due, 0), 0)
+
+    # Overdue invoices and aging buckets
+    overdue_mask = (days_past_due > 0) & (receivable > 0)
+    overdue_amounts = receivable[overdue_mask]
+    bucket_idx = np.searchsorted(OVERDUE_BUCKET_BOUNDS, days_past_due[overdue_mask], side="left")
+
+    # Payment timeliness for fully and partially paid invoices
+    dated_payment = has_due & (last_paid > 0)
+    paid_on_time = last_paid <= due
+    fully_paid = dated_payment & (received >= amounts)
+    partially_paid = dated_payment & (received > 0) & (received < amounts)
+
+    upcoming_mask = upcoming > today_ord
+
+    return {
+        "receivable": receivable,
+        "days_past_due": days_past_due,
+        "overdue_mask": overdue_mask,
+        "total_invoice_amount": float(amounts.sum()),
+        "total_received": float(received.sum()),
+        "total_receivable": float(receivable.sum()),
+        "total_overdue_amount": float(overdue_amounts.sum()),
+        "overdue_invoice_count": int(overdue_mask.sum()),
+        "paid_on_time_count": int((fully_paid & paid_on_time).sum()),
+        "paid_late_count": int((fully_paid & ~paid_on_time).sum()),
+        "upcoming_invoice_count": int(upcoming_mask.sum()),
+        "upcoming_invoice_amount": float(receivable[upcoming_mask].sum()),
+        "partial_paid_on_time_count": int((partially_paid & paid_on_time).sum()),
+        "partial_paid_late_count": int((partially_paid & ~paid_on_time).sum()),
+        "disputed_invoice_count": int(disputed.sum()),
+        "bucket_counts": np.bincount(bucket_idx, minlength=4),
+        "bucket_amounts": np.bincount(bucket_idx, weights=overdue_amounts, minlength=4),
+        "last_payment_ord": int(last_paid[fully_paid].max()) if fully_paid.any() else 0,
+        "next_upcoming_ord": int(upcoming[upcoming_mask].min()) if upcoming_mask.any() else 0,
+    }
 
 class Invoice_Analysis:
 
@@ -18,17 +102,19 @@ class Invoice_Analysis:
 
     # Function to parse date
     def parse_date(self, date_input: Optional[Any], multi_format: bool = False) -> Optional[date]:
+        # Exact type checks first: model fields hand back plain date/datetime objects
+        input_type = type(date_input)
+        if input_type is date:
+            return date_input
+        if input_type is datetime:
+            return date_input.date()
         if not date_input:
             return None
         if isinstance(date_input, datetime):
             return date_input.date()
         if isinstance(date_input, date):
             return date_input
-        try:
-            parsed_date = parse(str(date_input), dayfirst=True, fuzzy=False)
-            return parsed_date.date() if isinstance(parsed_date, datetime) else parsed_date
-        except (ValueError, TypeError):
-            return None
+        return _parse_date_str(str(date_input))
 
     def _get(self, obj: Union[Dict, Any], key: str, default: Any = None):
         """Safe getter that works for dict-like objects and model instances."""
@@ -45,24 +131,23 @@ class Invoice_Analysis:
     # Function to get overdue bucket
     def get_overdue_bucket(self, days_overdue: int) -> str:
         """Categorize overdue days into aging buckets."""
-        if days_overdue <= 30:
-            return "0-30 days"
-        elif 31 <= days_overdue <= 60:
-            return "31-60 days"
-        elif 61 <= days_overdue <= 90:
-            return "61-90 days"
-        else:
-            return "90+ days"
+        return OVERDUE_BUCKETS[bisect.bisect_left(OVERDUE_BUCKET_BOUNDS, days_overdue)]
                                                     
-    def calculate_client_score(self, metrics: Dict, invoices: List[Dict]) -> Dict:
+    def calculate_client_score(self, metrics: Dict, overdue_history: List[Tuple[int, int]]) -> Dict:
         """
         Calculates an enhanced client score based on a variety of financial metrics,
         including payment history, trends, and invoice characteristics, incorporating new requirements.
+        `overdue_history` holds (invoice date ordinal, days overdue) pairs for the overdue
+        invoices, as returned under "overdue_history" by calculate_client_metrics.
         """
         total_invoice_amount = metrics.get("total_invoice_amount", 0) or 1.0
         total_invoices = metrics.get("total_invoices", 0) or 1
         upcoming_invoices = metrics.get("upcoming_invoice_count", 0) or 0
         overdue_amount = metrics.get("total_overdue_amount", 0) or 0
+        # calculate_client_metrics supplies the ratio; other callers get it derived as before
+        overdue_amount_ratio = metrics.get("overdue_amount_ratio")
+        if overdue_amount_ratio is None:
+            overdue_amount_ratio = overdue_amount / total_invoice_amount
         avg_overdue_days = metrics.get("avg_overdue_days", 0) or 0
         overdue_percentage = metrics.get("overdue_percentage", 0) or 0
         on_time_payment_ratio = metrics.get("on_time_payment_ratio", 0.0)
@@ -85,7 +170,7 @@ class Invoice_Analysis:
         
         # --- Score Components ---
         # 1. Overdue Amount Score: How much of the total amount is overdue?
-        overdue_score = 1 - min(overdue_amount / total_invoice_amount, 1)
+        overdue_score = 1 - min(overdue_amount_ratio, 1)
 
         # 2. On-Time Payment Ratio Score: How consistently do they pay on time?
         on_time_ratio_score = on_time_payment_ratio
@@ -108,23 +193,14 @@ class Invoice_Analysis:
         project_value_bonus = min(total_invoice_amount / 500000, 0.05) # Bonus up to 5% for clients over 500k
 
         # 6. Payment Trend Analysis: Is payment behavior getting better or worse?
-        overdue_days_list = []
-        today = timezone.now().date()
-        for inv in invoices:
-            due_date = self.parse_date(inv.get("due_date"))
-            invoice_date = self.parse_date(inv.get("invoice_date"))
-            if due_date and invoice_date and due_date < today and float(inv.get("amount_overdue", 0)) > 0:
-                days_overdue = (today - due_date).days
-                overdue_days_list.append((invoice_date, days_overdue))
-
         trend_adjustment = 0.0
-        if len(overdue_days_list) >= 2:
-            overdue_days_list.sort(key=lambda x: x[0])
-            midpoint = len(overdue_days_list) // 2
-            recent_days = [days for _, days in overdue_days_list[midpoint:]]
-            older_days = [days for _, days in overdue_days_list[:midpoint]]
-            avg_recent = sum(recent_days) / len(recent_days) if recent_days else 0
-            avg_older = sum(older_days) / len(older_days) if older_days else 0
+        if len(overdue_history) >= 2:
+            history = np.array(overdue_history, dtype=np.int64)
+            # Order by invoice date; stable so same-day invoices keep their order
+            days_by_date = history[np.argsort(history[:, 0], kind="stable"), 1]
+            midpoint = len(days_by_date) // 2
+            avg_recent = float(days_by_date[midpoint:].mean())
+            avg_older = float(days_by_date[:midpoint].mean())
 
             if avg_recent > avg_older * 1.1 and avg_older > 0:
                 trend_adjustment = -0.1  # Worsening trend
@@ -165,8 +241,8 @@ class Invoice_Analysis:
             risk_level = "Low"
 
         key_factors = []
-        if overdue_amount / total_invoice_amount > 0.3:
-            key_factors.append(f"High overdue amount ratio: {(overdue_amount / total_invoice_amount):.2%}")
+        if overdue_amount_ratio > 0.3:
+            key_factors.append(f"High overdue amount ratio: {overdue_amount_ratio:.2%}")
         if on_time_payment_ratio < 0.6:
             key_factors.append(f"Low on-time payment ratio: {on_time_payment_ratio:.2%}")
         if trend_adjustment < 0.0:
@@ -219,12 +295,6 @@ class Invoice_Analysis:
             "disputed_invoice_count": 0,
             "recurring_delay_count": 0,
         }
-        overdue_days_list: List[int] = []
-        overdue_invoice_ids: List[Union[str, int]] = []
-        overdue_amount_list: List[float] = []
-        last_invoice_date = None
-        last_payment_date = None
-
         overdue_buckets = {
             "Upcoming": {"count": 0, "amount": 0.0},
             "0-30 days": {"count": 0, "amount": 0.0},
@@ -233,115 +303,93 @@ class Invoice_Analysis:
             "90+ days": {"count": 0, "amount": 0.0},
         }
 
-        late_payments_dates: List[date] = []
-        next_upcoming_payment_date = None
         invoice_count = len(invoices)
-        all_invoices_details: List[Dict[str, Any]] = []
 
+        # Pull every field out of the invoices once (struct-of-arrays), so the
+        # per-invoice arithmetic below runs as NumPy array operations.
+        amount_values: List[float] = []
+        received_values: List[float] = []
+        due_dates: List[Optional[date]] = []
+        last_paid_dates: List[Optional[date]] = []
+        upcoming_payment_dates: List[Optional[date]] = []
+        invoice_dates: List[Optional[date]] = []
+        disputed_flags: List[bool] = []
+        # Invoices are either all dicts or all model instances, so pick the accessor once
+        get = dict.get if invoices and isinstance(invoices[0], dict) else getattr
         for inv in invoices:
-            # Use _get to support both dicts and model instances
-            amount = float(self._get(inv, "invoice_amount") or 0.0)
-            received = float(self._get(inv, "last_paid_amount") or 0.0)
-            due_date = self.parse_date(self._get(inv, "due_date"))
-            last_paid_date_val = self.parse_date(self._get(inv, "last_paid_date"))
-            upcoming_payment_date = self.parse_date(self._get(inv, "upcoming_payment_date"))
-            invoice_date = self.parse_date(self._get(inv, "invoice_date"))
-            invoice_id_val = self._get(inv, "db_invoice_id")
-
-            receivable = max(amount - received, 0.0)
-            days_past_due = 0
-            payment_status = "Unpaid"
-
-            if received > 0:
-                if receivable <= 0:
-                    payment_status = "Paid"
-                else:
-                    payment_status = "Partially Paid"
-            
-            if due_date and due_date < today:
-                days_past_due = (today - due_date).days
-            else:
-                days_past_due = 0
-
-            is_disputed = bool(self._get(inv, "is_disputed", False))
-
-            metrics_data["total_invoice_amount"] += amount
-            metrics_data["total_received"] += received
-            metrics_data["total_receivable"] += receivable
-
-            if is_disputed:
-                metrics_data["disputed_invoice_count"] += 1
-
-            if invoice_date and (not last_invoice_date or invoice_date > last_invoice_date):
-                last_invoice_date = invoice_date
-
-            if due_date and due_date < today and receivable > 0:
-                days_overdue = (today - due_date).days
-                overdue_days_list.append(days_overdue)
-                overdue_invoice_ids.append(self._get(inv, "db_invoice_id"))
-                metrics_data["total_overdue_amount"] += receivable
-                overdue_amount_list.append(receivable)
-                metrics_data["overdue_invoice_count"] += 1
-
-                bucket_name = self.get_overdue_bucket(days_overdue)
-                overdue_buckets[bucket_name]["count"] += 1
-                overdue_buckets[bucket_name]["amount"] += receivable
-
-            if received >= amount and due_date and last_paid_date_val:
-                if not last_payment_date or last_paid_date_val > last_payment_date:
-                    last_payment_date = last_paid_date_val
-                if last_paid_date_val <= due_date:
-                    metrics_data["paid_on_time_count"] += 1
-                else:
-                    metrics_data["paid_late_count"] += 1
-                    late_payments_dates.append(last_paid_date_val)
-            elif 0 < received < amount and due_date and last_paid_date_val:
-                if last_paid_date_val <= due_date:
-                    metrics_data["partial_paid_on_time_count"] += 1
-                else:
-                    metrics_data["partial_paid_late_count"] += 1
-                    late_payments_dates.append(last_paid_date_val)
-
-            if upcoming_payment_date and upcoming_payment_date > today:
-                metrics_data["upcoming_invoice_count"] += 1
-                metrics_data["upcoming_invoice_amount"] += receivable
-                if not next_upcoming_payment_date or upcoming_payment_date < next_upcoming_payment_date:
-                    next_upcoming_payment_date = upcoming_payment_date
+            amount_values.append(float(get(inv, "invoice_amount", None) or 0.0))
+            received_values.append(float(get(inv, "last_paid_amount", None) or 0.0))
+            due_dates.append(self.parse_date(get(inv, "due_date", None)))
+            last_paid_dates.append(self.parse_date(get(inv, "last_paid_date", None)))
+            upcoming_payment_dates.append(self.parse_date(get(inv, "upcoming_payment_date", None)))
+            invoice_dates.append(self.parse_date(get(inv, "invoice_date", None)))
+            disputed_flags.append(bool(get(inv, "is_disputed", False)))
+
+        # Dates are held as ordinal days; 0 marks a missing date.
+        today_ord = today.toordinal()
+        amounts = np.array(amount_values, dtype=np.float64)
+        received = np.array(received_values, dtype=np.float64)
+        due = np.array([d.toordinal() if d else 0 for d in due_dates], dtype=np.int64)
+        last_paid = np.array([d.toordinal() if d else 0 for d in last_paid_dates], dtype=np.int64)
+        upcoming = np.array([d.toordinal() if d else 0 for d in upcoming_payment_dates], dtype=np.int64)
+        invoiced = np.array([d.toordinal() if d else 0 for d in invoice_dates], dtype=np.int64)
+        disputed = np.array(disputed_flags, dtype=bool)
+
+        agg = _aggregate_invoices(amounts, received, due, last_paid, upcoming, disputed, today_ord)
+        for key in metrics_data:
+            metrics_data[key] = agg.get(key, metrics_data[key])
+        receivable = agg["receivable"]
+        days_past_due = agg["days_past_due"]
+        overdue_mask = agg["overdue_mask"]
+        overdue_days = days_past_due[overdue_mask]
+        overdue_amounts = receivable[overdue_mask]
+        payment_status = np.where(received > 0, np.where(receivable <= 0, "Paid", "Partially Paid"), "Unpaid")
+
+        for i, bucket_name in enumerate(OVERDUE_BUCKETS):
+            overdue_buckets[bucket_name]["count"] = int(agg["bucket_counts"][i])
+            overdue_buckets[bucket_name]["amount"] = float(agg["bucket_amounts"][i])
+
+        last_invoice_date = date.fromordinal(int(invoiced.max())) if invoiced.any() else None
+        last_payment_date = date.fromordinal(agg["last_payment_ord"]) if agg["last_payment_ord"] else None
+        next_upcoming_payment_date = date.fromordinal(agg["next_upcoming_ord"]) if agg["next_upcoming_ord"] else None
+
+        # Overdue invoices with an invoice date, for trend analysis in calculate_client_score
+        history_mask = overdue_mask & (invoiced > 0)
+        overdue_history = list(zip(invoiced[history_mask].tolist(), days_past_due[history_mask].tolist()))
 
+        all_invoices_details: List[Dict[str, Any]] = []
+        for inv, invoice_date, due_date, last_paid_date_val, days, status, amount, outstanding in zip(
+            invoices, invoice_dates, due_dates, last_paid_dates,
+            days_past_due.tolist(), payment_status.tolist(), amount_values, receivable.tolist(),
+        ):
             all_invoices_details.append({
-                "invoice_number": self._get(inv, "invoice_number"),
-                "invoice_generated_date": str(invoice_date) if invoice_date else None,
-                "invoice_due_date": str(due_date) if due_date else None,
-                "days_past_due": days_past_due,
+                "invoice_number": get(inv, "invoice_number", None),
+                "invoice_generated_date": invoice_date.isoformat() if invoice_date else None,
+                "invoice_due_date": due_date.isoformat() if due_date else None,
+                "days_past_due": days,
                 "client_name": customer.customer_name,
-                "project_name": self._get(inv, "project_name"),
-                "milestone": self._get(inv, "milestone_name") or "",
+                "project_name": get(inv, "project_name", None),
+                "milestone": get(inv, "milestone_name", None) or "",
                 "invoice_amount": amount,
-                "payment_status": payment_status,
-                "payment_received_date": str(last_paid_date_val) if last_paid_date_val else None,
-                "outstanding_amount": receivable,
-                "currency": self._get(inv, "currency_type"),
+                "payment_status": status,
+                "payment_received_date": last_paid_date_val.isoformat() if last_paid_date_val else None,
+                "outstanding_amount": outstanding,
+                "currency": get(inv, "currency_type", None),
             })
 
         # Weighted average overdue days
-        weighted_overdue_days = sum(
-            days * next((float(self._get(inv_item, "amount_overdue", 0.0)) for inv_item in invoices if self._get(inv_item, "db_invoice_id") == inv_id), 0.0)
-            for days, inv_id in zip(overdue_days_list, overdue_invoice_ids)
-        )
-        total_weight = sum(overdue_amount_list)
+        weighted_overdue_days = float(np.dot(overdue_days.astype(np.float64), overdue_amounts))
+        total_weight = metrics_data["total_overdue_amount"]
         avg_overdue_days = weighted_overdue_days / total_weight if total_weight else 0.0
 
         # Overdue percentages
-        invoice_count = len(invoices)
         overdue_percentage_count = (metrics_data["overdue_invoice_count"] / invoice_count) * 100 if invoice_count else 0.0
-        overdue_percentage = round(0.7 * overdue_percentage_count + 0.3 * overdue_percentage_count, 2)
+        overdue_percentage = round(overdue_percentage_count, 2)
 
         # Percentiles
         percentile_25, median_amount, percentile_75 = (
-            (np.percentile(overdue_amount_list, 25),
-             statistics.median(overdue_amount_list),
-             np.percentile(overdue_amount_list, 75))
-            if overdue_amount_list else (0.0, 0.0, 0.0)
+            np.percentile(overdue_amounts, [25, 50, 75]).tolist()
+            if overdue_amounts.size else (0.0, 0.0, 0.0)
         )
 
         # Payment ratios
@@ -354,8 +402,8 @@ class Invoice_Analysis:
         is_recurring_delay = total_late_payments >= 3 and total_past_invoices >= 5
         recurring_delay_ratio = 1.0 if is_recurring_delay else 0.0
 
-        # Calculate overdue_percentage_amount correctly
-        overdue_percentage_amount = (metrics_data["total_overdue_amount"] / metrics_data["total_invoice_amount"] * 100) if metrics_data["total_invoice_amount"] > 0 else 0.0
+        # Share of the billed amount that is overdue; also drives the overdue score
+        overdue_amount_ratio = (metrics_data["total_overdue_amount"] / metrics_data["total_invoice_amount"]) if metrics_data["total_invoice_amount"] > 0 else 0.0
         
         final_metrics = {
             "customer_id": str(customer.customer_id),
@@ -364,9 +412,10 @@ class Invoice_Analysis:
             **metrics_data,
             "invoices_details": all_invoices_details,
             "overdue_percentage": overdue_percentage,
-            "overdue_percentage_amount": round(overdue_percentage_amount, 2),
+            "overdue_amount_ratio": overdue_amount_ratio,
+            "overdue_percentage_amount": round(overdue_amount_ratio * 100, 2),
             "overdue_percentage_count": round(overdue_percentage_count, 2),
-            "max_overdue_days": max(overdue_days_list) if overdue_days_list else 0,
+            "max_overdue_days": int(overdue_days.max()) if overdue_days.size else 0,
             "overdue_amount_percentile_25": round(percentile_25, 2),
             "overdue_amount_median": round(median_amount, 2),
             "overdue_amount_percentile_75": round(percentile_75, 2),
@@ -376,75 +425,126 @@ class Invoice_Analysis:
             "on_time_payment_ratio": round(on_time_payment_ratio, 4),
             "late_payment_ratio": round(late_payment_ratio, 4),
             "recurring_delay_ratio": round(recurring_delay_ratio, 4),
-            "next_upcoming_payment_date": str(next_upcoming_payment_date) if next_upcoming_payment_date else None,
-            "last_invoice_date": str(last_invoice_date) if last_invoice_date else None,
-            "last_payment_date": str(last_payment_date) if last_payment_date else None
+            "next_upcoming_payment_date": next_upcoming_payment_date.isoformat() if next_upcoming_payment_date else None,
+            "last_invoice_date": last_invoice_date.isoformat() if last_invoice_date else None,
+            "last_payment_date": last_payment_date.isoformat() if last_payment_date else None,
+            "overdue_history": overdue_history,
         }
         return final_metrics
 
-    def get_grouped_customer_invoice_data(self, customers_queryset=None, invoice_id=None) -> Optional[List[Dict]]:
-        """Fetch and process invoice data for customers."""
-        from django.db.models import Q
+    def _get_customers_queryset(self, invoice_id=None):
+        """Customers to report on: the customer owning invoice_id, or every active customer. None if not found."""
         invoice_qs = InvoiceData.objects.filter(is_deleted=False).select_related('customer_id')
+        # Followups ride along with the invoices so sentiment lookup needs no extra queries
+        followup_prefetch = Prefetch(
+            'customer_invoice__followup_set', queryset=active_followups(), to_attr='_prefetched_followups'
+        )
 
         if invoice_id is not None:
             try:
                 invoice_id = int(invoice_id)
                 customer = invoice_qs.get(id=invoice_id).customer_id
                 if customer:
-                    customers_queryset = CustomerData.objects.filter(id=customer.id)
+                    return CustomerData.objects.filter(id=customer.id).prefetch_related(followup_prefetch)
                 else: 
                     return None
             except (InvoiceData.DoesNotExist, ValueError):
                 return None
-        else:
-            customers_queryset = CustomerData.objects.filter(
-                is_active=True, is_deleted=False
-            ).prefetch_related(Prefetch('customer_invoice', queryset=invoice_qs.filter(is_deleted=False)))
-
-        results = []
-        for customer in customers_queryset:
-            invoice_list = []
-            for inv in customer.customer_invoice.all():
-                invoice_data = {
-                    "db_invoice_id": inv.id,
-                    "invoice_number": inv.invoice_number,
-                    "project_name": inv.project_name,
-                    "milestone_name": inv.milestone_name,
-                    "currency_type": inv.currency_type,
-                    "invoice_date": self.parse_date(inv.invoice_date),
-                    "due_date": self.parse_date(inv.due_date),
-                    "invoice_amount": float(inv.invoice_amount or 0),
-                    "amount_overdue": round(float(inv.amount_overdue or 0), 2),
-                    "total_recivable": float(inv.total_recivable or 0),
-                    "is_overdue": inv.is_overdue,
-                    "is_disputed": getattr(inv, "is_disputed", False),
-                    "upcoming_payment_date": self.parse_date(inv.upcoming_payment_date),
-                    "last_paid_amount": float(inv.last_paid_amount or 0),
-                    "last_paid_date": self.parse_date(inv.last_paid_date),
-                }
-                invoice_list.append(invoice_data)
-
-            metrics = self.calculate_client_metrics(customer, invoice_list)
-
-            # Get sentiment score from communication with improved error handling
-            sentiment_score_from_comm = 0.5  # Default neutral
-            try:
-                sentiment_data = get_client_followups(customer_id=customer.id)
-                if sentiment_data and len(sentiment_data) > 0:
-                    analysis = sentiment_data[0].get("data", {}).get("analysis", {})
-                    sentiment_score_from_comm = analysis.get("sentiment_score", 0.5)
-                    self.logger.info(f"Fetched sentiment score {sentiment_score_from_comm} for customer {customer.id}")
-            except Exception as e:
-                self.logger.warning(f"Could not fetch sentiment for customer {customer.id}: {e}")
-            
-            metrics['sentiment_score_from_comm'] = sentiment_score_from_comm
+        return CustomerData.objects.filter(
+            is_active=True, is_deleted=False
+        ).prefetch_related(
+            Prefetch('customer_invoice', queryset=invoice_qs.filter(is_deleted=False).only(*INVOICE_METRIC_FIELDS)),
+            followup_prefetch,
+        )
+
+    def get_grouped_customer_invoice_data(self, customers_queryset=None, invoice_id=None) -> Optional[List[Dict]]:
+        """Fetch and process invoice data for customers."""
+        customers_queryset = self._get_customers_queryset(invoice_id)
+        if customers_queryset is None:
+            return None
+
+        results = list(self.iter_customer_invoice_data(customers_queryset))
 
-            score_details = self.calculate_client_score(metrics, invoice_list)
-            metrics.update(score_details)
-            results.append(metrics)
-        
         self.logger.info(f"Successfully processed billing data for {len(results)} customers.")
         
         # Wrap results in the expected format
-        return {"results": results} if results else {"results": []} 
\ No newline at end of file
+        return {"results": results} if results else {"results": []}
+
+    def stream_grouped_customer_invoice_data(self, invoice_id=None) -> Optional[Iterator[str]]:
+        """
+        Same response as get_grouped_customer_invoice_data, encoded as JSON text chunks
+        (one per customer) for a StreamingHttpResponse, so only one customer's metrics
+        are held in memory at a time. None if invoice_id does not match an invoice.
+        """
+        customers_queryset = self._get_customers_queryset(invoice_id)
+        if customers_queryset is None:
+            return None
+
+        def chunks():
+            yield '{"results": ['
+            count = 0
+            for metrics in self.iter_customer_invoice_data(customers_queryset):
+                yield (", " if count else "") + json.dumps(metrics, cls=DjangoJSONEncoder)
+                count += 1
+            yield "]}"
+            self.logger.info(f"Successfully processed billing data for {count} customers.")
+
+        return chunks()
+
+    def _iter_customer_chunks(self, customers_queryset, chunk_size: int) -> Iterator[List[CustomerData]]:
+        """Read customers in lists of up to `chunk_size`, keeping the queryset's prefetches."""
+        if django.VERSION >= (4, 1):
+            # QuerySet.iterator() only honours prefetch_related (given a chunk_size) from Django 4.1
+            customers = customers_queryset.iterator(chunk_size=chunk_size)
+            while True:
+                customer_chunk = list(itertools.islice(customers, chunk_size))
+                if not customer_chunk:
+                    return
+                yield customer_chunk
+        # Older Django: page by primary key so each page is a regular, prefetching query
+        page_qs = customers_queryset.order_by('pk')
+        last_pk = None
+        while True:
+            page = page_qs if last_pk is None else page_qs.filter(pk__gt=last_pk)
+            customer_chunk = list(page[:chunk_size])
+            if not customer_chunk:
+                return
+            yield customer_chunk
+            last_pk = customer_chunk[-1].pk
+
+    def iter_customer_invoice_data(self, customers_queryset, chunk_size: int = 200) -> Iterator[Dict[str, Any]]:
+        """
+        Yield billing metrics one customer at a time, reading customers from the
+        database in chunks of `chunk_size` so the full result set is never held in memory.
+        """
+        for customer_chunk in self._iter_customer_chunks(customers_queryset, chunk_size):
+            # Fetch sentiment for the whole chunk in one batch instead of once per customer
+            sentiment_by_customer = {}
+            try:
+                sentiment_data = get_client_followups(customers_queryset=customer_chunk)
+                sentiment_by_customer = {item["customer_id"]: item for item in sentiment_data}
+            except Exception as e:
+                self.logger.warning(f"Could not fetch sentiment for customers: {e}")
+
+            for customer in customer_chunk:
+                # calculate_client_metrics reads model instances directly
+                invoice_list = list(customer.customer_invoice.all())
+
+                metrics = self.calculate_client_metrics(customer, invoice_list)
+
+                # Get sentiment score from communication
+                sentiment_score_from_comm = 0.5  # Default neutral
+                sentiment_item = sentiment_by_customer.get(customer.customer_id)
+                if sentiment_item:
+                    analysis = sentiment_item.get("data", {}).get("analysis", {})
+                    sentiment_score_from_comm = analysis.get("sentiment_score", 0.5)
+                    self.logger.info(f"Fetched sentiment score {sentiment_score_from_comm} for customer {customer.id}")
+
+                metrics['sentiment_score_from_comm'] = sentiment_score_from_comm
+
+                overdue_history = metrics.pop("overdue_history")
+                score_details = self.calculate_client_score(metrics, overdue_history)
+                # Only shared with the scoring step; the response carries overdue_percentage_amount
+                del metrics["overdue_amount_ratio"]
+                metrics.update(score_details)
+                yield metrics
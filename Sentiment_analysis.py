@@ -1,12 +1,63 @@
 import os
 import json
+import hashlib
+import heapq
+import logging
+from typing import List, Union
 from dotenv import load_dotenv
 from openai import OpenAI
+from django.core.cache import cache
+from django.db.models import F
 from api.models import FollowUp, CustomerSentimentSummary
 
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Analyses are deterministic (temperature=0.0), so identical inputs are served from cache
+ANALYSIS_CACHE_TIMEOUT = 60 * 60 * 24
+ANALYSIS_MODEL = "gpt-3.5-turbo"
+
+
+_PROMPT_TEMPLATE = """You are a relationship and sentiment analysis engine.
+Your goal is to evaluate the relationship dynamics between two individuals
+based solely on their communication.
+
+Focus only on interpersonal cues: trust, engagement, satisfaction,
+commitment, cooperation, and overall relationship health.
+
+Analyze sentiment as positive, neutral, or negative based strictly on tone,
+wording, and context. Compare the current communication with past interactions
+to identify improvement, decline, or stability.
+
+Always return ONLY valid JSON with no extra text.
+
+Past Status: {past_status}
+Past Summary: {past_summary}
+
+Current Text: {current_text}
+
+Return JSON with:
+- "past_status": "strong", "weak", "inconsistent", or "none"
+- "current_status": "strong", "weak", or "inconsistent"
+- "relationship_trend": "improving", "declining", or "stable"
+- "sentiment_score": floating-point value strictly between 0.0 (very negative) and 1.0 (very positive)
+- "sentiment": "positive", "neutral", or "negative"
+- "communication_clarity": "clear", "ambiguous", or "confused"
+- "response_pattern": "balanced", "one-sided", or "avoidant"
+- "key_notes": ["bullet point 1", "bullet point 2", "bullet point 3"]
+{message_scores_field}"""
+
+
+# Cached analyses are only valid for the model and prompt that produced them, so both are in the key
+_PROMPT_VERSION = hashlib.blake2b(_PROMPT_TEMPLATE.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def _analysis_cache_key(comments: Union[str, List[str]], past_summary: str, past_status: str) -> str:
+    payload = json.dumps([ANALYSIS_MODEL, _PROMPT_VERSION, comments, past_summary, past_status], ensure_ascii=False)
+    return "sentiment:" + hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
 
 class SentimentAnalyzer:
     """Sentiment + relationship dynamics analyzer."""
@@ -17,94 +68,161 @@ class SentimentAnalyzer:
             raise RuntimeError(" Missing OpenAI API key. Set OPENAI_API_KEY in environment.")
         self.client = OpenAI(api_key=self.api_key)
 
-    def analyze(self, comments: str, past_summary: str = "", past_status: str = "") -> dict:
+    def analyze(self, comments: Union[str, List[str]], past_summary: str = "", past_status: str = "") -> dict:
+        """
+        Analyze a block of text, or a list of messages in a single request.
+        For a list, the result also carries "message_sentiment_scores" with one
+        score per message, in order.
+        """
         if not comments:
             return {"error": "No text provided for analysis."}
 
-        prompt = f"""
-        You are a relationship and sentiment analysis engine.
-        Your goal is to evaluate the relationship dynamics between two individuals
-        based solely on their communication.
-
-        Focus only on interpersonal cues: trust, engagement, satisfaction,
-        commitment, cooperation, and overall relationship health.
+        cache_key = _analysis_cache_key(comments, past_summary, past_status)
+        cached_analysis = cache.get(cache_key)
+        if cached_analysis is not None:
+            return cached_analysis
 
-        Analyze sentiment as positive, neutral, or negative based strictly on tone,
-        wording, and context. Compare the current communication with past interactions
-        to identify improvement, decline, or stability.
-
-        Always return ONLY valid JSON with no extra text.
-
-        Past Status: "{past_status or 'none'}"
-        Past Summary: "{past_summary or 'No previous summary available.'}"
-
-        Current Text: "{comments}"
+        if isinstance(comments, str):
+            current_text = comments
+            message_scores_field = ""
+        else:
+            current_text = "\n".join(f"[{i}] {text}" for i, text in enumerate(comments, 1))
+            message_scores_field = (
+                '- "message_sentiment_scores": list with one sentiment_score per numbered message, in the same order'
+            )
 
-        Return JSON with:
-        - "past_status": "strong", "weak", "inconsistent", or "none"
-        - "current_status": "strong", "weak", or "inconsistent"
-        - "relationship_trend": "improving", "declining", or "stable"
-        - "sentiment_score": floating-point value strictly between 0.0 (very negative) and 1.0 (very positive)
-        - "sentiment": "positive", "neutral", or "negative"
-        - "communication_clarity": "clear", "ambiguous", or "confused"
-        - "response_pattern": "balanced", "one-sided", or "avoidant"
-        - "key_notes": ["bullet point 1", "bullet point 2", "bullet point 3"]
-        """
+        prompt = _PROMPT_TEMPLATE.format(
+            past_status=json.dumps(past_status or "none"),
+            past_summary=json.dumps(past_summary or "No previous summary available."),
+            current_text=json.dumps(current_text, ensure_ascii=False),
+            message_scores_field=message_scores_field,
+        )
 
         try:
             response = self.client.chat.completions.create(
-                model="gpt-3.5-turbo",
+                model=ANALYSIS_MODEL,
                 messages=[{"role": "user", "content": prompt}],
                 temperature=0.0,
             )
             output = response.choices[0].message.content.strip()
-            return json.loads(output)
+            analysis = json.loads(output)
+            cache.set(cache_key, analysis, ANALYSIS_CACHE_TIMEOUT)
+            return analysis
         except json.JSONDecodeError:
             return {"error": "Invalid JSON returned from model", "raw_output": output}
         except Exception as e:
             return {"error": str(e)}
 
 
-def get_client_followups(limit: int = 50, customer_id: int = None):
+def active_followups():
+    """Followups on invoices that are not deleted, oldest first (by created_at, then id)."""
+    # NULLS LAST on every backend, matching _followup_order_key
+    return FollowUp.objects.filter(invoice__is_deleted=False).order_by(F("created_at").asc(nulls_last=True), "id")
+
+
+def _followup_order_key(followup):
+    """Sort key for the active_followups() order; a missing created_at sorts last."""
+    created_at = followup.created_at
+    return (0, created_at, followup.id) if created_at is not None else (1, followup.id)
+
+
+def _get_prefetched_followups(customers):
+    """
+    Return the followups prefetched onto each customer's invoices as
+    `_prefetched_followups` in active_followups() order, or None when they were not prefetched.
+    """
+    per_invoice = []
+    for customer in customers:
+        for invoice in customer.customer_invoice.all():
+            invoice_followups = getattr(invoice, "_prefetched_followups", None)
+            if invoice_followups is None:
+                return None
+            per_invoice.append(invoice_followups)
+    # Each invoice's list is already ordered by active_followups(); merge them into one global order
+    return list(heapq.merge(*per_invoice, key=_followup_order_key))
+
+
+def get_client_followups(limit: int = 50, customer_id: int = None, customers_queryset=None):
     """
     Collect followups per client and return sentiment analysis summary
     in the exact response format required.
     If customer_id is provided, only that customer is processed.
+    If customers_queryset (a queryset or list of customers) is provided, followups
+    for all of those customers are fetched in a single query and `limit` applies
+    per customer.
     """
 
-    followup_qs = FollowUp.objects.filter(invoice__customer_id=customer_id).select_related('invoice__customer_id')
-    followups = followup_qs[:limit]
-    if not followups:
+    if customers_queryset is not None:
+        followups = _get_prefetched_followups(customers_queryset)
+        if followups is None:
+            followups = active_followups().filter(invoice__customer_id__in=customers_queryset).select_related('invoice__customer_id')
+    else:
+        followup_qs = active_followups().filter(invoice__customer_id=customer_id).select_related('invoice__customer_id')
+        followups = followup_qs[:limit]
+
+    # Group followups by client, keeping at most `limit` per client
+    followups_by_client = {}
+    clients = {}
+    for f in followups:
+        client = f.invoice.customer_id
+        clients[client.id] = client
+        client_followups = followups_by_client.setdefault(client.id, [])
+        if len(client_followups) < limit:
+            client_followups.append(f)
+    if not followups_by_client:
         return []
 
+    # Fetch sentiment summaries in one query and create the missing ones in bulk
+    sentiment_records = {
+        record.customer_id: record
+        for record in CustomerSentimentSummary.objects.filter(customer_id__in=list(clients))
+    }
+    missing_records = [
+        CustomerSentimentSummary(customer=client)
+        for client_id, client in clients.items() if client_id not in sentiment_records
+    ]
+    if missing_records:
+        CustomerSentimentSummary.objects.bulk_create(missing_records)
+        # Re-read so every record has a primary key regardless of database backend
+        sentiment_records = {
+            record.customer_id: record
+            for record in CustomerSentimentSummary.objects.filter(customer_id__in=list(clients))
+        }
+
     analyzer = SentimentAnalyzer()
     client_data = {}
 
    
-    for f in followups:
-        client = f.invoice.customer_id
-        client_id = client.id
-
-        if client_id not in client_data:
-            client_sentiment, _ = CustomerSentimentSummary.objects.get_or_create(customer=client)
-
-            client_data[client_id] = {
-                "customer_id": getattr(client, "customer_id", str(client.id)),
-                "customer_name": getattr(client, "customer_name", client.customer_name),
-                "all_texts": [],
-                # "past_summary": client_sentiment.past_summary or "",
-                # "past_status": client_sentiment.past_status or "none",
-                "followups_flow": [],
-                "sentiment_record": client_sentiment,
-            }
+    for client_id, client_followups in followups_by_client.items():
+        client = clients[client_id]
+        # One request per client: the overall analysis plus a score per followup
         analysis = analyzer.analyze(
-            comments=f.comments
+            comments=[f.comments for f in client_followups]
         )
-        client_data[client_id]["all_texts"].append(f.comments)
-        client_data[client_id]["followups_flow"].append({
-            "date": f.created_at.strftime("%Y-%m-%d"),
-            "sentiment_score": analysis.get("sentiment_score", 0.0)
-        })
+        message_scores = analysis.pop("message_sentiment_scores", None)
+        if not isinstance(message_scores, list):
+            message_scores = []
+        if len(message_scores) != len(client_followups):
+            # Followups without a score get None rather than a made-up 0.0 sentiment
+            logger.warning(
+                f"Sentiment analysis for customer {client_id} returned {len(message_scores)} "
+                f"message scores for {len(client_followups)} followups"
+            )
+        client_data[client_id] = {
+            "customer_id": getattr(client, "customer_id", str(client.id)),
+            "customer_name": getattr(client, "customer_name", client.customer_name),
+            "analysis": analysis,
+            # "past_summary": client_sentiment.past_summary or "",
+            # "past_status": client_sentiment.past_status or "none",
+            "followups_flow": [
+                {
+                    "date": f.created_at.strftime("%Y-%m-%d"),
+                    "sentiment_score": message_scores[i] if i < len(message_scores) else None
+                }
+                for i, f in enumerate(client_followups)
+            ],
+            "sentiment_record": sentiment_records[client_id],
+        }
     
     # print("Client data from followups --------",client_data)
 
@@ -112,11 +230,7 @@ def get_client_followups(limit: int = 50, customer_id: int = None):
 
     
     for client_id, data in client_data.items():
-        full_text = " ".join(data["all_texts"])
-
-        analysis = analyzer.analyze(
-            comments=full_text
-        )
+        analysis = data["analysis"]
 
       
         # for flow in data["followups_flow"]:
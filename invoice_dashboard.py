@@ -1,10 +1,21 @@
 import streamlit as st
 import pandas as pd
+import numpy as np
+from pathlib import Path
 import plotly.express as px
 import plotly.graph_objects as go
-import time
+import plotly.io as pio
+from collections import Counter
+from itertools import chain
 from mock_data import get_mock_customer_data
 
+# Serialize figures with orjson when it is installed; plotly falls back to json otherwise.
+try:
+    import orjson  # noqa: F401
+    pio.json.config.default_engine = 'orjson'
+except ImportError:
+    pass
+
 # Set page configuration
 st.set_page_config(
     page_title="Invoice Dashboard",
@@ -14,112 +25,163 @@ st.set_page_config(
 )
 
 # --- Custom CSS for Premium Styling ---
-st.markdown("""
-<style>
-    @import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap');
-    html, body, [class*="css"] {
-        font-family: 'Inter', sans-serif;
-        color: #e2e8f0; /* Lighter text for dark theme */
-    }
-    .stApp {
-        background-color: #0f172a; /* Dark blue background */
-    }
-    .metric-card {
-        background-color: #1e293b; /* Darker card background */
-        padding: 24px;
-        border-radius: 16px;
-        box-shadow: 0 4px 20px rgba(0,0,0,0.2);
-        border: 1px solid #334155;
-        display: flex;
-        flex-direction: column;
-        justify-content: space-between;
-        height: 100%;
-        transition: transform 0.2s ease, box-shadow 0.2s ease;
-    }
-    .metric-card:hover {
-        transform: translateY(-2px);
-        box-shadow: 0 10px 25px rgba(0,0,0,0.3);
-    }
-    .metric-value {
-        font-size: 32px;
-        font-weight: 700;
-        color: #f8fafc; /* White text for values */
-        margin-bottom: 4px;
-    }
-    .metric-label {
-        font-size: 14px;
-        color: #94a3b8; /* Lighter grey for labels */
-        font-weight: 500;
-        text-transform: uppercase;
-        letter-spacing: 0.05em;
-    }
-    .metric-delta {
-        font-size: 13px;
-        font-weight: 600;
-        margin-top: 8px;
-    }
-    .delta-pos { color: #22c55e; } /* Brighter green */
-    .delta-neg { color: #f87171; } /* Brighter red */
-    
-    /* Custom Button Styling */
-    .stButton button {
-        width: 100%;
-        border-radius: 8px;
-        font-weight: 600;
-        padding: 0.5rem 1rem;
-        transition: all 0.2s;
-    }
-    
-    /* Table Styling */
-    .stDataFrame {
-        border-radius: 12px;
-        overflow: hidden;
-        box-shadow: 0 4px 6px -1px rgba(0, 0, 0, 0.1);
-    }
-    
-    /* Header Styling */
-    h1, h2, h3 {
-        color: #f8fafc; /* White text for headers */
-        font-weight: 700;
-    }
-    
-    /* Sidebar Styling */
-    [data-testid="stSidebar"] {
-        background-color: #1e293b; /* Dark sidebar */
-        border-right: 1px solid #334155;
-    }
-</style>
-""", unsafe_allow_html=True)
+STYLES_PATH = Path(__file__).with_name("styles.css")
+FONT_URL = "https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700&display=swap"
+
+@st.cache_resource
+def app_css():
+    """Font links plus the stylesheet from styles.css, read from disk once per process."""
+    return (
+        '<link rel="preconnect" href="https://fonts.googleapis.com">'
+        '<link rel="preconnect" href="https://fonts.gstatic.com" crossorigin>'
+        f'<link rel="stylesheet" href="{FONT_URL}">'
+        f"<style>\n{STYLES_PATH.read_text(encoding='utf-8')}</style>"
+    )
+
+# Streamlit drops any element a rerun does not emit again, so the styles are
+# sent on every run; only building the string is cached.
+st.markdown(app_css(), unsafe_allow_html=True)
 
 # --- Load Data ---
-@st.cache_data
+# Shared as a resource, without a per-rerun copy; the app only ever reads it
+@st.cache_resource
 def load_data():
     return get_mock_customer_data()
 
+CUSTOMER_ARRAY_DTYPE = np.dtype([
+    ('total_receivable', np.float64),
+    ('total_overdue_amount', np.float64),
+    ('high_risk', np.bool_),
+])
+
+@st.cache_resource
+def build_customer_arrays(_data):
+    """Customer-level columns as one structured array, filled in a single pass over the data."""
+    return np.fromiter(
+        ((c['total_receivable'], c['total_overdue_amount'], c['risk_level'] == 'High') for c in _data),
+        dtype=CUSTOMER_ARRAY_DTYPE,
+        count=len(_data),
+    )
+
+# Status column labels; unpaid invoices past due are flagged as overdue
+STATUS_LABELS = {"Overdue": "🔴 Overdue", "Paid": "🟢 Paid"}
+DEFAULT_STATUS_PREFIX = "🟠 "
+
+def status_label_column(df):
+    """Color-coded status label for every invoice, chosen with one np.select over the status columns."""
+    labels = np.select(
+        [(df['payment_status'] == "Unpaid") & (df['days_past_due'] > 0), df['payment_status'] == "Paid"],
+        [STATUS_LABELS["Overdue"], STATUS_LABELS["Paid"]],
+        default=DEFAULT_STATUS_PREFIX + df['payment_status'].astype(str).to_numpy(dtype=object),
+    )
+    return pd.Categorical(labels)
+
+AGING_BUCKETS = ("Upcoming", "0-30 days", "31-60 days", "61-90 days", "90+ days")
+
+@st.cache_resource
+def build_bucket_matrix(_data):
+    """Aging bucket amounts as one (customers x buckets) float32 matrix, rows in data order."""
+    return np.array(
+        [[c['overdue_buckets'].get(bucket, {}).get('amount', 0.0) for bucket in AGING_BUCKETS] for c in _data],
+        dtype=np.float32,
+    ).reshape(len(_data), len(AGING_BUCKETS))
+
+@st.cache_resource
+def prepare_invoice_dataframe(_data):
+    """All invoices flattened into one DataFrame with a customer_name column and parsed dates.
+
+    Built once alongside load_data() and shared read-only, like the data it is derived from.
+    """
+    df = pd.DataFrame(list(chain.from_iterable(customer['invoices_details'] for customer in _data)))
+    if not df.empty:
+        df['customer_name'] = np.repeat(
+            [customer['customer_name'] for customer in _data],
+            [len(customer['invoices_details']) for customer in _data],
+        )
+        # Dates are parsed here, once per data load; the explicit format skips pandas' format inference
+        df['invoice_generated_date'] = pd.to_datetime(df['invoice_generated_date'], format='%Y-%m-%d', cache=True)
+        df['invoice_due_date'] = pd.to_datetime(df['invoice_due_date'], format='%Y-%m-%d', cache=True)
+        # Money stays float64: float32 cannot hold cents exactly above ~100k
+        df = df.astype({
+            'days_past_due': 'int16',
+            'payment_status': 'category',
+            'customer_name': 'category',
+            'client_name': 'category',
+            'project_name': 'category',
+            'milestone': 'category',
+            'currency': 'category',
+        })
+        df['status_label'] = status_label_column(df)
+    return df
+
+@st.cache_resource
+def build_customer_index(_data):
+    """Customer names in data order and each name's position in data."""
+    customer_names = [c['customer_name'] for c in _data]
+    name_to_index = {name: i for i, name in enumerate(customer_names)}
+    return customer_names, name_to_index
+
+@st.cache_data
+def make_report_csv(customer_id, _invoices_details):
+    """CSV download for one customer; invoices come from the cached data, so customer_id is the key."""
+    return pd.DataFrame(_invoices_details).to_csv(index=False).encode('utf-8')
+
 data = load_data()
+df_invoices = prepare_invoice_dataframe(data)
+customer_arrays = build_customer_arrays(data)
+bucket_matrix = build_bucket_matrix(data)
+customer_names, name_to_index = build_customer_index(data)
 
 # --- Session State Management ---
-if 'view_mode' not in st.session_state:
-    st.session_state['view_mode'] = "Dashboard Overview"
+# The sidebar navigation radio's own state is the current view
+if 'sidebar_nav' not in st.session_state:
+    st.session_state['sidebar_nav'] = "Dashboard Overview"
 if 'selected_customer' not in st.session_state:
     st.session_state['selected_customer'] = data[0]['customer_name']
-if 'is_loading' not in st.session_state:
-    st.session_state['is_loading'] = False
-
-def simulate_api_call():
-    """Simulates an API call with a spinner."""
-    with st.spinner('Fetching billing insights from server...'):
-        time.sleep(1.2)  # Simulate latency
 
 def switch_to_analysis(customer_name):
     st.session_state['selected_customer'] = customer_name
-    st.session_state['view_mode'] = "Customer Analysis"
-    st.session_state['is_loading'] = True
+    st.session_state['sidebar_nav'] = "Customer Analysis"
+
+def sync_selected_customer():
+    """on_change callback for the Customer Analysis client selector."""
+    st.session_state['selected_customer'] = st.session_state['customer_selector']
+
+def analyze_selected_invoice():
+    """on_select callback for the Recent Invoices table; opens the selected row's customer."""
+    rows = st.session_state['inv_table'].selection.rows
+    if rows:
+        switch_to_analysis(df_invoices['customer_name'].iat[rows[0]])
 
 # --- Helper Functions ---
 def format_currency(value):
     return f"${value:,.2f}"
 
+TREND_MAX_POINTS = 2000
+
+def lttb_downsample(x, y, n_out):
+    """Indices of the points kept by Largest-Triangle-Three-Buckets downsampling of (x, y) to n_out."""
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # First and last points are always kept; the rest are split into n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    prev = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[end:next_end].mean() if next_end > end else x[-1]
+        avg_y = y[end:next_end].mean() if next_end > end else y[-1]
+        # Keep the point in this bucket that forms the largest triangle with the previous pick and the next bucket's mean
+        area = np.abs((x[prev] - avg_x) * (y[start:end] - y[prev]) - (x[prev] - x[start:end]) * (avg_y - y[prev]))
+        prev = start + int(np.argmax(area))
+        keep[i + 1] = prev
+    return keep
+
 def create_metric_card(label, value, delta=None, delta_color="normal", trend_icon=None):
     delta_html = ""
     if delta:
@@ -144,78 +206,63 @@ with st.sidebar:
     st.markdown("---")
 
     # Navigation
-    selection = st.radio(
+    st.radio(
         "Navigation", 
         ["Dashboard Overview", "Customer Analysis"], 
-        index=0 if st.session_state['view_mode'] == "Dashboard Overview" else 1,
         key="sidebar_nav"
     )
 
     st.markdown("---")
     st.caption("v2.0.0 | Premium Edition")
 
-# Sync sidebar with session state
-if selection != st.session_state['view_mode']:
-    st.session_state['view_mode'] = selection
-    if selection == "Customer Analysis":
-         st.session_state['is_loading'] = True
-    st.rerun()
-
 # --- Main Content ---
 
-if st.session_state['view_mode'] == "Dashboard Overview":
+if st.session_state['sidebar_nav'] == "Dashboard Overview":
     st.title("📊 Dashboard Overview")
     st.markdown("Real-time financial insights and performance metrics.")
     st.markdown("<br>", unsafe_allow_html=True)
 
-    # --- Cached Metric Calculations ---
-    @st.cache_data
-    def get_aggregate_metrics(_data):
-        total_receivable = sum(item['total_receivable'] for item in _data)
-        total_overdue = sum(item['total_overdue_amount'] for item in _data)
-        total_customers = len(_data)
-        high_risk_customers = sum(1 for item in _data if item['risk_level'] == 'High')
-        return total_receivable, total_overdue, total_customers, high_risk_customers
+    # --- Metric Calculations ---
+    def get_aggregate_metrics(customer_arrays):
+        # Plain column reductions over the cached structured array; cheap enough to skip caching
+        return {
+            'total_receivable': float(customer_arrays['total_receivable'].sum()),
+            'total_overdue': float(customer_arrays['total_overdue_amount'].sum()),
+            'total_customers': customer_arrays.size,
+            'high_risk_customers': int(np.count_nonzero(customer_arrays['high_risk'])),
+        }
 
     @st.cache_data
-    def prepare_trend_data(_data):
-        all_invoices = [inv for customer in _data for inv in customer['invoices_details']]
-        df_inv = pd.DataFrame(all_invoices)
-        df_inv['invoice_generated_date'] = pd.to_datetime(df_inv['invoice_generated_date'])
-        return df_inv.groupby(pd.Grouper(key='invoice_generated_date', freq='M')).sum(numeric_only=True).reset_index()
-
-    total_receivable, total_overdue, total_customers, high_risk_customers = get_aggregate_metrics(data)
-    
-    # Display Metrics in Custom Cards
-    col1, col2, col3, col4 = st.columns(4)
-    with col1:
-        create_metric_card("Total Receivable", format_currency(total_receivable), "+12% vs last month")
-    with col2:
-        create_metric_card("Total Overdue", format_currency(total_overdue), "+5% vs last month", delta_color="inverse")
-    with col3:
-        create_metric_card("Active Customers", str(total_customers), "+2 new this month")
-    with col4:
-        create_metric_card("High Risk Clients", str(high_risk_customers), "-1 vs last month", delta_color="inverse")
-
-    st.markdown("<br>", unsafe_allow_html=True)
+    def monthly_trend(_df_invoices):
+        return _df_invoices.resample('ME', on='invoice_generated_date')['invoice_amount'].sum().reset_index()
 
-    # Charts Section
-    c1, c2 = st.columns([3, 2])
-
-    with c1:
-        st.subheader("📈 Revenue & Overdue Trends")
-        df_trend = prepare_trend_data(data)
-
-        fig_trend = px.line(
-            df_trend, 
-            x='invoice_generated_date', 
-            y='invoice_amount', 
-            markers=True,
-            line_shape='spline',
-            title="Monthly Invoice Volume",
-            color_discrete_sequence=['#3b82f6']
-        )
+    @st.cache_data
+    def count_risk_levels(risk_levels):
+        counts = Counter(risk_levels).most_common()
+        return pd.DataFrame(counts, columns=['risk_level', 'count'])
+
+    # Figures depend only on the loaded data, so they are built once and reused across reruns
+    @st.cache_resource
+    def build_trend_figure(_df_invoices):
+        df_trend = monthly_trend(_df_invoices)
+        if len(df_trend) > TREND_MAX_POINTS:
+            keep = lttb_downsample(
+                df_trend['invoice_generated_date'].to_numpy().astype(np.int64),
+                df_trend['invoice_amount'].to_numpy(),
+                TREND_MAX_POINTS
+            )
+            df_trend = df_trend.iloc[keep]
+
+        # Built directly as a WebGL trace; px.line would only wrap the same Scattergl
+        fig_trend = go.Figure(go.Scattergl(
+            x=df_trend['invoice_generated_date'],
+            y=df_trend['invoice_amount'],
+            mode='lines+markers',
+            line_color='#3b82f6',
+            name='Invoice Amount'
+        ))
         fig_trend.update_layout(
+            title="Monthly Invoice Volume",
             plot_bgcolor='#1e293b',
             paper_bgcolor='#1e293b',
             xaxis_title="Date",
@@ -223,15 +270,16 @@ if st.session_state['view_mode'] == "Dashboard Overview":
             hovermode="x unified",
             font_color="#e2e8f0"
         )
+        # WebGL traces have no spline shape; pinning the range skips autorange on the client.
+        if not df_trend.empty:
+            fig_trend.update_xaxes(range=[df_trend['invoice_generated_date'].min(), df_trend['invoice_generated_date'].max()])
         fig_trend.update_xaxes(showgrid=False)
         fig_trend.update_yaxes(showgrid=True, gridcolor='#f1f5f9')
-        st.plotly_chart(fig_trend, use_container_width=True)
+        return fig_trend
 
-    with c2:
-        st.subheader("⚠️ Risk Distribution")
-        df_overview = pd.DataFrame(data)
-        risk_counts = df_overview['risk_level'].value_counts().reset_index()
-        risk_counts.columns = ['risk_level', 'count']
+    @st.cache_resource
+    def build_risk_figure(_data):
+        risk_counts = count_risk_levels(tuple(item['risk_level'] for item in _data))
 
         fig_pie = px.pie(
             risk_counts, 
@@ -249,113 +297,89 @@ if st.session_state['view_mode'] == "Dashboard Overview":
             legend=dict(orientation="h", yanchor="bottom", y=-0.2, xanchor="center", x=0.5),
             font_color="#e2e8f0"
         )
-        st.plotly_chart(fig_pie, use_container_width=True)
+        return fig_pie
 
-    # Recent Invoices Table
-    st.subheader("Recent Invoices")
+    aggregates = get_aggregate_metrics(customer_arrays)
+    total_receivable = aggregates['total_receivable']
+    total_overdue = aggregates['total_overdue']
+    total_customers = aggregates['total_customers']
+    high_risk_customers = aggregates['high_risk_customers']
+    
+    # Display Metrics in Custom Cards
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        create_metric_card("Total Receivable", format_currency(total_receivable), "+12% vs last month")
+    with col2:
+        create_metric_card("Total Overdue", format_currency(total_overdue), "+5% vs last month", delta_color="inverse")
+    with col3:
+        create_metric_card("Active Customers", str(total_customers), "+2 new this month")
+    with col4:
+        create_metric_card("High Risk Clients", str(high_risk_customers), "-1 vs last month", delta_color="inverse")
 
-    # Prepare Table Data
-    all_invoices_list = []
-    for customer in data:
-        for inv in customer['invoices_details']:
-            inv_copy = inv.copy()
-            inv_copy['customer_name'] = customer['customer_name']
-            all_invoices_list.append(inv_copy)
+    st.markdown("<br>", unsafe_allow_html=True)
+
+    # Charts Section
+    c1, c2 = st.columns([3, 2])
+
+    with c1:
+        st.subheader("📈 Revenue & Overdue Trends")
+        st.plotly_chart(build_trend_figure(df_invoices), use_container_width=True)
+
+    with c2:
+        st.subheader("⚠️ Risk Distribution")
+        st.plotly_chart(build_risk_figure(data), use_container_width=True)
 
-    df_invoices = pd.DataFrame(all_invoices_list)
+    # Recent Invoices Table
+    st.subheader("Recent Invoices")
 
     if not df_invoices.empty:
         # The filter section was removed, so we use the full df_invoices DataFrame
-        df_filtered = df_invoices.copy()
+        df_filtered = df_invoices
         
-        # --- Pagination ---
-        items_per_page = 10
-        total_items = len(df_filtered)
-        total_pages = (total_items // items_per_page) + (1 if total_items % items_per_page > 0 else 0)
-        
-        if 'page_number' not in st.session_state:
-            st.session_state.page_number = 1
-
-        # Page selector
-        col_nav1, col_nav2 = st.columns([4, 1])
-        with col_nav2:
-            page_num = st.number_input(f"Page (1-{total_pages})", min_value=1, max_value=total_pages, value=st.session_state.page_number, key="page_selector")
-            st.session_state.page_number = page_num
-
-        start_idx = (st.session_state.page_number - 1) * items_per_page
-        end_idx = start_idx + items_per_page
-        paginated_df = df_filtered.iloc[start_idx:end_idx]
-
-        # --- Custom Table with Buttons ---
-        # Custom Table Header
-        h1, h2, h3, h4, h5, h6 = st.columns([1.5, 2, 1.5, 1.5, 1.5, 1])
-        h1.markdown("**Invoice #**")
-        h2.markdown("**Client**")
-        h3.markdown("**Due Date**")
-        h4.markdown("**Amount**")
-        h5.markdown("**Status**")
-        h6.markdown("**Action**")
-        st.markdown("<hr style='margin: 0.5rem 0; border-color: #334155;'>", unsafe_allow_html=True)
-
-        for index, row in paginated_df.iterrows():
-            c1, c2, c3, c4, c5, c6 = st.columns([1.5, 2, 1.5, 1.5, 1.5, 1])
-            c1.write(row['invoice_number'])
-            c2.write(row['customer_name'])
-            c3.write(row['invoice_due_date'])
-            c4.write(format_currency(row['invoice_amount']))
-
-            # Status Badge
-            status = row['payment_status']
-            bg_color = "#fee2e2" if status == "Unpaid" and row['days_past_due'] > 0 else "#dcfce7" if status == "Paid" else "#ffedd5"
-            text_color = "#991b1b" if status == "Unpaid" and row['days_past_due'] > 0 else "#166534" if status == "Paid" else "#9a3412"
-            c5.markdown(f"""
-            <span style='background-color: {bg_color}; color: {text_color}; padding: 4px 8px; border-radius: 12px; font-size: 12px; font-weight: 600;'>
-                {status}
-            </span>
-            """, unsafe_allow_html=True)
-
-            if c6.button("Analyze", key=f"btn_{row['invoice_number']}"):
-                switch_to_analysis(row['customer_name'])
-                st.rerun()
+        # --- Invoice Table ---
+        # st.dataframe draws only the visible rows, so the whole list is sent without pagination
+        st.dataframe(
+            df_filtered[['invoice_number', 'customer_name', 'invoice_due_date', 'invoice_amount', 'status_label']],
+            use_container_width=True,
+            hide_index=True,
+            key="inv_table",
+            on_select=analyze_selected_invoice,
+            selection_mode="single-row",
+            column_config={
+                "invoice_number": st.column_config.TextColumn("Invoice #"),
+                "customer_name": st.column_config.TextColumn("Client"),
+                "invoice_due_date": st.column_config.DateColumn("Due Date", format="YYYY-MM-DD"),
+                "invoice_amount": st.column_config.NumberColumn("Amount", format="$%.2f"),
+                "status_label": st.column_config.TextColumn("Status"),
+            }
+        )
+
+        st.caption("Select an invoice row to open its customer in Billing Analysis.")
 
     else:
         st.info("No invoices found matching criteria.")
 
-elif st.session_state['view_mode'] == "Customer Analysis":
-
-    # Check if we need to simulate loading
-    if st.session_state.get('is_loading', False):
-        simulate_api_call()
-        st.session_state['is_loading'] = False
-        st.rerun()
+elif st.session_state['sidebar_nav'] == "Customer Analysis":
 
     # Top Bar
     col_title, col_sel = st.columns([3, 1])
     with col_title:
         st.title("🔍 Billing Analysis")
     with col_sel:
-        customer_names = [item['customer_name'] for item in data]
-        try:
-            current_index = customer_names.index(st.session_state['selected_customer'])
-        except ValueError:
-            current_index = 0
+        current_index = name_to_index.get(st.session_state['selected_customer'], 0)
 
-        selected_customer_name = st.selectbox(
+        st.selectbox(
             "Select Client", 
             customer_names, 
             index=current_index,
             key="customer_selector",
+            on_change=sync_selected_customer,
             label_visibility="collapsed"
         )
 
-   
-    if selected_customer_name != st.session_state['selected_customer']:
-        st.session_state['selected_customer'] = selected_customer_name
-        st.session_state['is_loading'] = True
-        st.rerun()
-
     
-    customer_data = next(item for item in data if item['customer_name'] == st.session_state['selected_customer'])
+    customer_index = name_to_index[st.session_state['selected_customer']]
+    customer_data = data[customer_index]
 
    
     st.markdown(f"""
@@ -393,15 +417,13 @@ elif st.session_state['view_mode'] == "Customer Analysis":
 
     st.markdown("<br>", unsafe_allow_html=True)
 
-    # Analysis Section
-    row1_1, row1_2 = st.columns([2, 1])
-
-    with row1_1:
-        st.subheader(" Aging Analysis")
-        buckets = customer_data['overdue_buckets']
-        bucket_df = pd.DataFrame([
-            {"Bucket": k, "Amount": v["amount"]} for k, v in buckets.items()
-        ])
+    # One aging figure per customer; only recently viewed customers are kept
+    @st.cache_resource(max_entries=64)
+    def build_aging_figure(customer_index):
+        bucket_df = pd.DataFrame({
+            "Bucket": AGING_BUCKETS,
+            "Amount": bucket_matrix[customer_index],
+        })
 
         fig_aging = px.bar(
             bucket_df, 
@@ -420,7 +442,14 @@ elif st.session_state['view_mode'] == "Customer Analysis":
             font_color="#e2e8f0"
         )
         fig_aging.update_yaxes(showgrid=True, gridcolor='#f1f5f9')
-        st.plotly_chart(fig_aging, use_container_width=True)
+        return fig_aging
+
+    # Analysis Section
+    row1_1, row1_2 = st.columns([2, 1])
+
+    with row1_1:
+        st.subheader(" Aging Analysis")
+        st.plotly_chart(build_aging_figure(customer_index), use_container_width=True)
 
     with row1_2:
         st.subheader("💡 AI Insights")
@@ -440,7 +469,7 @@ elif st.session_state['view_mode'] == "Customer Analysis":
         st.subheader("Invoice History")
     with c_btn:
         # Download Button
-        csv = pd.DataFrame(customer_data['invoices_details']).to_csv(index=False).encode('utf-8')
+        csv = make_report_csv(customer_data['customer_id'], customer_data['invoices_details'])
         st.download_button(
             label="📥 Download Report",
             data=csv,
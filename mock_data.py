@@ -1,11 +1,47 @@
 import datetime
-import random
+import numpy as np
+
+# Per-profile ranges: (low, high) bounds for uniform draws, inclusive (low, high) for invoice counts.
+# Sentiment trends are drawn uniformly from each profile's tuple, so repeats act as weights.
+PAYMENT_PROFILES = {
+    "excellent": {"invoices": (10, 30), "amount": (500000, 2000000), "payment": (0.95, 1.0), "overdue": (0.0, 0.0),
+                  "client_score": (0.90, 1.0), "sentiment": (0.85, 1.0), "trends": ("Rising", "Stable"), "risk": "Low"},
+    "good": {"invoices": (8, 25), "amount": (200000, 800000), "payment": (0.85, 0.95), "overdue": (0.0, 0.05),
+             "client_score": (0.75, 0.90), "sentiment": (0.70, 0.85), "trends": ("Rising", "Stable", "Stable"), "risk": "Low"},
+    "medium": {"invoices": (5, 20), "amount": (100000, 500000), "payment": (0.60, 0.85), "overdue": (0.05, 0.20),
+               "client_score": (0.50, 0.75), "sentiment": (0.45, 0.70), "trends": ("Stable", "Stable", "Falling"), "risk": "Medium"},
+    "poor": {"invoices": (5, 15), "amount": (50000, 300000), "payment": (0.40, 0.60), "overdue": (0.20, 0.40),
+             "client_score": (0.30, 0.50), "sentiment": (0.25, 0.45), "trends": ("Falling", "Falling", "Stable"), "risk": "High"},
+    "critical": {"invoices": (3, 12), "amount": (30000, 200000), "payment": (0.10, 0.40), "overdue": (0.40, 0.80),
+                 "client_score": (0.10, 0.30), "sentiment": (0.10, 0.25), "trends": ("Falling",), "risk": "High"},
+}
+
+# Key factors and recommendations per profile; each client record gets its own list copy, as the API returns lists
+FACTORS_BY_PROFILE = {
+    "excellent": ("Excellent payment behavior",),
+    "good": ("Excellent payment behavior",),
+    "medium": ("Inconsistent payment schedule",),
+    "poor": ("Multiple overdue invoices",),
+    "critical": ("Multiple overdue invoices",),
+}
+RECOMMENDATIONS_BY_PROFILE = {
+    "excellent": ("Offer extended credit terms for retention",),
+    "good": ("Offer extended credit terms for retention",),
+    "medium": ("Monitor upcoming invoices closely",),
+    "poor": ("Implement stricter payment terms",),
+    "critical": ("Implement stricter payment terms",),
+}
+
+OVERDUE_BUCKET_KEYS = ["0-30 days", "31-60 days", "61-90 days", "90+ days"]
+
 
 def generate_mock_clients(num_clients=1500):
     """
     Generate a large number of mock clients with realistic data patterns.
+    Every random field is drawn for all clients (or all invoices) in one vectorized call.
     """
-    today = datetime.date.today()
+    rng = np.random.default_rng()
+    today = np.datetime64(datetime.date.today(), 'D')
     
     # Company name templates
     company_prefixes = ["Tech", "Global", "Advanced", "Digital", "Smart", "Innovative", "Prime", "Elite", "Dynamic", "Strategic"]
@@ -15,170 +51,132 @@ def generate_mock_clients(num_clients=1500):
     projects = ["Cloud Migration", "Website Redesign", "Mobile App", "Data Analytics", "Security Audit", 
                 "Infrastructure Upgrade", "CRM Implementation", "API Development", "Consulting Services", "Training Program"]
     
+    n = num_clients
+    profile_names = list(PAYMENT_PROFILES)
+    profiles = [PAYMENT_PROFILES[name] for name in profile_names]
+    profile_idx = rng.integers(0, len(profiles), size=n)
+
+    def bounds(field):
+        table = np.array([profile[field] for profile in profiles], dtype=np.float64)
+        return table[profile_idx, 0], table[profile_idx, 1]
+
+    # Randomize payment behavior
+    lo, hi = bounds("invoices")
+    total_invoices = rng.integers(lo.astype(np.int64), hi.astype(np.int64) + 1)
+    total_amount = rng.uniform(*bounds("amount"))
+    payment_ratio = rng.uniform(*bounds("payment"))
+    overdue_ratio = rng.uniform(*bounds("overdue"))
+    client_score = rng.uniform(*bounds("client_score"))
+    sentiment_score = rng.uniform(*bounds("sentiment"))
+    trend_counts = np.array([len(profile["trends"]) for profile in profiles])[profile_idx]
+    trend_pick = (rng.random(n) * trend_counts).astype(np.int64)
+
+    total_received = total_amount * payment_ratio
+    total_receivable = total_amount - total_received
+    total_overdue = total_receivable * overdue_ratio
+    overdue_count = np.where(total_overdue > 0, np.maximum(1, (total_invoices * overdue_ratio).astype(np.int64)), 0)
+
+    # Distribute overdue amounts across buckets, oldest bucket last
+    bucket_counts = np.zeros((len(OVERDUE_BUCKET_KEYS), n), dtype=np.int64)
+    bucket_amounts = np.zeros((len(OVERDUE_BUCKET_KEYS), n))
+    remaining_count = overdue_count.copy()
+    remaining_overdue = total_overdue.copy()
+    for b in range(len(OVERDUE_BUCKET_KEYS)):
+        active = remaining_count > 0
+        count = np.where(active, rng.integers(0, remaining_count + 1), 0)
+        amount = np.where(remaining_count > 1, remaining_overdue * rng.uniform(0.1, 0.5, size=n), remaining_overdue)
+        amount = np.where(active, amount, 0.0)
+        bucket_counts[b] = count
+        bucket_amounts[b] = np.round(amount, 2)
+        remaining_count -= count
+        remaining_overdue -= amount
+
+    # Add upcoming invoices
+    upcoming_count = rng.integers(0, 4, size=n)
+    upcoming_amount = np.round(np.where(total_receivable > total_overdue, total_receivable - total_overdue, 0.0), 2)
+
+    # Generate sample invoices (limit to 5 for performance)
+    num_sample_invoices = np.minimum(5, total_invoices)
+    owner = np.repeat(np.arange(n), num_sample_invoices)
+    m = owner.size
+    phase = np.arange(m) - np.repeat(np.cumsum(num_sample_invoices) - num_sample_invoices, num_sample_invoices)
+    # Dates are computed as datetime64[D] arrays; .tolist() turns them into datetime.date in one C pass
+    invoice_dates = today - rng.integers(10, 181, size=m).astype('timedelta64[D]')
+    due_dates = invoice_dates + rng.integers(20, 41, size=m).astype('timedelta64[D]')
+    days_past_due = np.maximum(0, (today - due_dates).astype(np.int64))
+    invoice_amount = (total_amount / total_invoices)[owner]
+
+    # Determine payment status
+    settled = rng.random(m) < payment_ratio[owner]
+    fully_paid = rng.random(m) < 0.8
+    payment_status = np.select([settled & fully_paid, settled], ["Paid", "Partially Paid"], default="Unpaid")
+    outstanding = np.select(
+        [settled & fully_paid, settled],
+        [0.0, invoice_amount * rng.uniform(0.2, 0.5, size=m)],
+        default=invoice_amount,
+    )
+    project_idx = rng.integers(0, len(projects), size=m)
+
+    prefix_idx = rng.integers(0, len(company_prefixes), size=n).tolist()
+    suffix_idx = rng.integers(0, len(company_suffixes), size=n).tolist()
+    company_names = [f"{company_prefixes[p]} {company_suffixes[q]} {i+1}" for i, (p, q) in enumerate(zip(prefix_idx, suffix_idx))]
+
+    # Only assembling the nested dicts is left to Python
+    invoice_columns = zip(
+        owner.tolist(), phase.tolist(), invoice_dates.tolist(), due_dates.tolist(), days_past_due.tolist(),
+        project_idx.tolist(), np.round(invoice_amount, 2).tolist(), payment_status.tolist(), np.round(outstanding, 2).tolist(),
+    )
+    invoices_by_client = [[] for _ in range(n)]
+    for i, j, invoice_date, due_date, past_due, project, amount, status, outstanding_amount in invoice_columns:
+        invoices_by_client[i].append({
+            "invoice_number": f"INV-{1000 + i}-{j+1:03d}",
+            "invoice_generated_date": invoice_date,
+            "invoice_due_date": due_date,
+            "days_past_due": past_due,
+            "client_name": company_names[i],
+            "project_name": projects[project],
+            "milestone": f"Phase {j+1}",
+            "invoice_amount": amount,
+            "payment_status": status,
+            "outstanding_amount": outstanding_amount,
+            "currency": "USD"
+        })
+
+    bucket_counts = bucket_counts.T.tolist()
+    bucket_amounts = bucket_amounts.T.tolist()
+    client_columns = zip(
+        profile_idx.tolist(), trend_pick.tolist(), total_invoices.tolist(), np.round(total_amount, 2).tolist(),
+        np.round(total_received, 2).tolist(), np.round(total_receivable, 2).tolist(), np.round(total_overdue, 2).tolist(),
+        overdue_count.tolist(), client_score.tolist(), np.round(sentiment_score, 2).tolist(),
+        upcoming_count.tolist(), upcoming_amount.tolist(),
+    )
     clients = []
-    
-    for i in range(num_clients):
-        customer_id = 1000 + i
-        company_name = f"{random.choice(company_prefixes)} {random.choice(company_suffixes)} {i+1}"
-        
-        # Randomize payment behavior
-        payment_profile = random.choice(["excellent", "good", "medium", "poor", "critical"])
-        
-        if payment_profile == "excellent":
-            total_invoices = random.randint(10, 30)
-            total_amount = random.uniform(500000, 2000000)
-            payment_ratio = random.uniform(0.95, 1.0)
-            overdue_ratio = 0.0
-            client_score = random.uniform(0.90, 1.0)
-            sentiment_score = random.uniform(0.85, 1.0)
-            sentiment_trend = random.choice(["Rising", "Stable"])
-            risk_level = "Low"
-        elif payment_profile == "good":
-            total_invoices = random.randint(8, 25)
-            total_amount = random.uniform(200000, 800000)
-            payment_ratio = random.uniform(0.85, 0.95)
-            overdue_ratio = random.uniform(0.0, 0.05)
-            client_score = random.uniform(0.75, 0.90)
-            sentiment_score = random.uniform(0.70, 0.85)
-            sentiment_trend = random.choice(["Rising", "Stable", "Stable"])
-            risk_level = "Low"
-        elif payment_profile == "medium":
-            total_invoices = random.randint(5, 20)
-            total_amount = random.uniform(100000, 500000)
-            payment_ratio = random.uniform(0.60, 0.85)
-            overdue_ratio = random.uniform(0.05, 0.20)
-            client_score = random.uniform(0.50, 0.75)
-            sentiment_score = random.uniform(0.45, 0.70)
-            sentiment_trend = random.choice(["Stable", "Stable", "Falling"])
-            risk_level = "Medium"
-        elif payment_profile == "poor":
-            total_invoices = random.randint(5, 15)
-            total_amount = random.uniform(50000, 300000)
-            payment_ratio = random.uniform(0.40, 0.60)
-            overdue_ratio = random.uniform(0.20, 0.40)
-            client_score = random.uniform(0.30, 0.50)
-            sentiment_score = random.uniform(0.25, 0.45)
-            sentiment_trend = random.choice(["Falling", "Falling", "Stable"])
-            risk_level = "High"
-        else:  # critical
-            total_invoices = random.randint(3, 12)
-            total_amount = random.uniform(30000, 200000)
-            payment_ratio = random.uniform(0.10, 0.40)
-            overdue_ratio = random.uniform(0.40, 0.80)
-            client_score = random.uniform(0.10, 0.30)
-            sentiment_score = random.uniform(0.10, 0.25)
-            sentiment_trend = "Falling"
-            risk_level = "High"
-        
-        total_received = total_amount * payment_ratio
-        total_receivable = total_amount - total_received
-        total_overdue = total_receivable * overdue_ratio
-        overdue_count = max(1, int(total_invoices * overdue_ratio)) if total_overdue > 0 else 0
-        
-        # Generate key factors and recommendations based on profile
-        key_factors = []
-        recommendations = []
-        
-        if payment_profile in ["excellent", "good"]:
-            key_factors.append("Excellent payment behavior")
-            recommendations.append("Offer extended credit terms for retention")
-        elif payment_profile == "medium":
-            key_factors.append("Inconsistent payment schedule")
-            recommendations.append("Monitor upcoming invoices closely")
-        else:
-            key_factors.append("Multiple overdue invoices")
-            recommendations.append("Implement stricter payment terms")
-        
-        # Distribute overdue amounts across buckets
-        overdue_buckets = {
-            "Upcoming": {"count": 0, "amount": 0.0},
-            "0-30 days": {"count": 0, "amount": 0.0},
-            "31-60 days": {"count": 0, "amount": 0.0},
-            "61-90 days": {"count": 0, "amount": 0.0},
-            "90+ days": {"count": 0, "amount": 0.0},
-        }
-        
-        if total_overdue > 0:
-            # Distribute overdue across buckets
-            bucket_keys = ["0-30 days", "31-60 days", "61-90 days", "90+ days"]
-            remaining_overdue = total_overdue
-            remaining_count = overdue_count
-            
-            for bucket in bucket_keys:
-                if remaining_count > 0:
-                    count = random.randint(0, remaining_count)
-                    amount = remaining_overdue * random.uniform(0.1, 0.5) if remaining_count > 1 else remaining_overdue
-                    overdue_buckets[bucket]["count"] = count
-                    overdue_buckets[bucket]["amount"] = round(amount, 2)
-                    remaining_count -= count
-                    remaining_overdue -= amount
-        
-        # Add upcoming invoices
-        upcoming_count = random.randint(0, 3)
-        upcoming_amount = total_receivable - total_overdue if total_receivable > total_overdue else 0
-        overdue_buckets["Upcoming"]["count"] = upcoming_count
-        overdue_buckets["Upcoming"]["amount"] = round(upcoming_amount, 2)
-        
-        # Generate sample invoices (limit to 5 for performance)
-        invoices_details = []
-        num_sample_invoices = min(5, total_invoices)
-        
-        for j in range(num_sample_invoices):
-            days_ago = random.randint(10, 180)
-            due_days = random.randint(20, 40)
-            invoice_date = today - datetime.timedelta(days=days_ago)
-            due_date = invoice_date + datetime.timedelta(days=due_days)
-            days_past_due = max(0, (today - due_date).days) if due_date < today else 0
-            
-            invoice_amount = total_amount / total_invoices
-            
-            # Determine payment status
-            if random.random() < payment_ratio:
-                if random.random() < 0.8:
-                    payment_status = "Paid"
-                    outstanding = 0.0
-                else:
-                    payment_status = "Partially Paid"
-                    outstanding = invoice_amount * random.uniform(0.2, 0.5)
-            else:
-                payment_status = "Unpaid"
-                outstanding = invoice_amount
-            
-            invoices_details.append({
-                "invoice_number": f"INV-{customer_id}-{j+1:03d}",
-                "invoice_generated_date": invoice_date,
-                "invoice_due_date": due_date,
-                "days_past_due": days_past_due,
-                "client_name": company_name,
-                "project_name": random.choice(projects),
-                "milestone": f"Phase {j+1}",
-                "invoice_amount": round(invoice_amount, 2),
-                "payment_status": payment_status,
-                "outstanding_amount": round(outstanding, 2),
-                "currency": "USD"
-            })
-        
-        client = {
-            "customer_id": customer_id,
-            "customer_name": company_name,
-            "total_invoices": total_invoices,
-            "total_invoice_amount": round(total_amount, 2),
-            "total_received": round(total_received, 2),
-            "total_receivable": round(total_receivable, 2),
-            "total_overdue_amount": round(total_overdue, 2),
-            "overdue_invoice_count": overdue_count,
-            "client_score": round(client_score, 2),
-            "sentiment_score": round(sentiment_score, 2),
-            "sentiment_trend": sentiment_trend,
-            "risk_level": risk_level,
-            "key_factors": key_factors,
-            "recommendations": recommendations,
-            "analysis_summary": f"Client score is {client_score:.2f} ({risk_level} risk). {key_factors[0]}.",
+    for i, (p, trend, invoices, amount, received, receivable, overdue, count, score, sentiment, up_count, up_amount) in enumerate(client_columns):
+        profile = profiles[p]
+        key_factors = FACTORS_BY_PROFILE[profile_names[p]]
+        overdue_buckets = {"Upcoming": {"count": up_count, "amount": up_amount}}
+        for key, b_count, b_amount in zip(OVERDUE_BUCKET_KEYS, bucket_counts[i], bucket_amounts[i]):
+            overdue_buckets[key] = {"count": b_count, "amount": b_amount}
+
+        clients.append({
+            "customer_id": 1000 + i,
+            "customer_name": company_names[i],
+            "total_invoices": invoices,
+            "total_invoice_amount": amount,
+            "total_received": received,
+            "total_receivable": receivable,
+            "total_overdue_amount": overdue,
+            "overdue_invoice_count": count,
+            "client_score": round(score, 2),
+            "sentiment_score": sentiment,
+            "sentiment_trend": profile["trends"][trend],
+            "risk_level": profile["risk"],
+            "key_factors": list(key_factors),
+            "recommendations": list(RECOMMENDATIONS_BY_PROFILE[profile_names[p]]),
+            "analysis_summary": f"Client score is {score:.2f} ({profile['risk']} risk). {key_factors[0]}.",
             "overdue_buckets": overdue_buckets,
-            "invoices_details": invoices_details
-        }
-        
-        clients.append(client)
+            "invoices_details": invoices_by_client[i]
+        })
     
     return clients
 
@@ -190,3 +188,4 @@ def get_mock_customer_data():
     """
     # Generate 1500 clients for comprehensive testing
     return generate_mock_clients(num_clients=1500)
+
@@ -3,170 +3,503 @@ Test script to validate BillingAnalysis output structure.
 This script validates that the response matches the expected JSON structure.
 """
 
+import copy
 import json
+import sys
 from datetime import date
+from itertools import chain
 
-def validate_billing_response(response_data):
-    """Validate the billing analysis response structure."""
-
-    errors = []
-
-    # Check top-level structure
-    if not isinstance(response_data, dict):
-        errors.append("Response must be a dictionary")
-        return errors
-
-    if "results" not in response_data:
-        errors.append("Response must contain 'results' key")
-        return errors
-
-    if not isinstance(response_data["results"], list):
-        errors.append("'results' must be a list")
-        return errors
-
-    # Validate each customer result
-    for idx, customer in enumerate(response_data["results"]):
-        prefix = f"Customer {idx}"
-
-        # Required string fields
-        string_fields = ["customer_id", "customer_name", "risk_level", "analysis_summary"]
-        for field in string_fields:
-            if field not in customer:
-                errors.append(f"{prefix}: Missing field '{field}'")
-            elif not isinstance(customer.get(field), str):
-                errors.append(f"{prefix}: Field '{field}' must be a string")
-
-        # Required numeric fields
-        numeric_fields = [
-            "total_invoices", "total_invoice_amount", "total_received", 
-            "total_receivable", "total_overdue_amount", "overdue_invoice_count",
-            "client_score", "sentiment_score"
-        ]
-        for field in numeric_fields:
-            if field not in customer:
-                errors.append(f"{prefix}: Missing field '{field}'")
-            elif not isinstance(customer.get(field), (int, float)):
-                errors.append(f"{prefix}: Field '{field}' must be numeric")
-
-        # Required list fields
-        list_fields = ["key_factors", "recommendations", "invoices_details"]
-        for field in list_fields:
-            if field not in customer:
-                errors.append(f"{prefix}: Missing field '{field}'")
-            elif not isinstance(customer.get(field), list):
-                errors.append(f"{prefix}: Field '{field}' must be a list")
-
-        # Validate overdue_buckets structure
-        if "overdue_buckets" not in customer:
-            errors.append(f"{prefix}: Missing 'overdue_buckets'")
-        else:
-            buckets = customer["overdue_buckets"]
-            required_buckets = ["Upcoming", "0-30 days", "31-60 days", "61-90 days", "90+ days"]
-            for bucket in required_buckets:
-                if bucket not in buckets:
-                    errors.append(f"{prefix}: Missing bucket '{bucket}' in overdue_buckets")
+import numpy as np
+
+# JSON Schema (draft-4 subset) of a billing analysis response. It is compiled into a
+# single straight-line Python function at import; see _compile_validator below.
+_TYPE_TEXT = {"string": "a string", "number": "numeric", "array": "a list", "object": "an object"}
+# Exact type() compares: responses are decoded JSON, so values are always plain built-ins
+_TYPE_MISMATCH = {
+    "string": "type({}) is not str",
+    "number": "type({}) not in _NUMBER_TYPES",
+    "array": "type({}) is not list",
+    "object": "type({}) is not dict",
+}
+_NUMBER_TYPES = frozenset({int, float})
+_MISSING = object()
+
+_STRING_FIELDS = ("customer_id", "customer_name", "risk_level", "analysis_summary")
+_NUMERIC_FIELDS = (
+    "total_invoices", "total_invoice_amount", "total_received",
+    "total_receivable", "total_overdue_amount", "overdue_invoice_count",
+    "client_score", "sentiment_score"
+)
+_LIST_FIELDS = ("key_factors", "recommendations", "invoices_details")
+_REQUIRED_BUCKETS = ("Upcoming", "0-30 days", "31-60 days", "61-90 days", "90+ days")
+_REQUIRED_BUCKET_FIELDS = ("count", "amount")
+_REQUIRED_INVOICE_FIELDS = (
+    "invoice_number", "invoice_generated_date", "invoice_due_date",
+    "days_past_due", "client_name", "project_name", "milestone",
+    "invoice_amount", "payment_status", "outstanding_amount", "currency"
+)
+
+_INVOICE_SCHEMA = {"type": "object", "required": _REQUIRED_INVOICE_FIELDS}
+
+_CUSTOMER_SCHEMA = {
+    "type": "object",
+    "required": _STRING_FIELDS + _NUMERIC_FIELDS + _LIST_FIELDS + ("overdue_buckets",),
+    "properties": {
+        **{field: {"type": "string"} for field in _STRING_FIELDS},
+        **{field: {"type": "number"} for field in _NUMERIC_FIELDS},
+        **{field: {"type": "array"} for field in _LIST_FIELDS},
+        "overdue_buckets": {
+            "type": "object",
+            "required": _REQUIRED_BUCKETS,
+            "properties": {
+                bucket: {"type": "object", "required": _REQUIRED_BUCKET_FIELDS} for bucket in _REQUIRED_BUCKETS
+            },
+        },
+    },
+}
+_CUSTOMER_SCHEMA["properties"]["invoices_details"]["items"] = _INVOICE_SCHEMA
+
+BILLING_RESPONSE_SCHEMA = {
+    "type": "object",
+    "required": ("results",),
+    "properties": {"results": {"type": "array", "items": _CUSTOMER_SCHEMA}},
+}
+
+
+def _compile_validator():
+    """
+    Generate the source of a validator for BILLING_RESPONSE_SCHEMA and exec it.
+    Every field check is unrolled with its key as a literal, so validating a response
+    runs one function with no per-field loops or schema lookups.
+    Returns (validate, fast_validate); the second only answers whether a response is valid.
+    """
+    customer = BILLING_RESPONSE_SCHEMA["properties"]["results"]["items"]
+    lines = [
+        "def validate(response_data):",
+        "    errors = []",
+        "    if type(response_data) is not dict:",
+        "        errors.append(('response_not_dict',))",
+        "        return errors",
+        "    if 'results' not in response_data:",
+        "        errors.append(('missing_results',))",
+        "        return errors",
+        "    results = response_data['results']",
+        "    if type(results) is not list:",
+        "        errors.append(('results_not_list',))",
+        "        return errors",
+        "    for idx, customer in enumerate(results):",
+    ]
+    namespace = {"_NUMBER_TYPES": _NUMBER_TYPES, "_MISSING": _MISSING}
+
+    def required_set(keys):
+        """Bind keys as a frozenset constant of the generated module and return its name."""
+        name = f"_REQUIRED_{len(namespace)}"
+        namespace[name] = frozenset(keys)
+        return name
+
+    def field_checks(indent, all_present):
+        # With all_present the caller has already checked every required key is there,
+        # so values are indexed directly and only the type checks remain. Otherwise each
+        # field is one .get() against the _MISSING sentinel: this path only runs when
+        # something is missing, where try/except KeyError would pay for a raised exception.
+        pad = " " * indent
+        out = []
+        for field, prop in customer["properties"].items():
+            if prop["type"] == "object":
+                # Nested objects (overdue_buckets): each required key must be an object with its own required keys
+                nested_required = required_set(prop["required"])
+                if all_present:
+                    out.append(f"{pad}nested = customer[{field!r}]")
                 else:
-                    if "count" not in buckets[bucket] or "amount" not in buckets[bucket]:
-                        errors.append(f"{prefix}: Bucket '{bucket}' missing 'count' or 'amount'")
-
-        # Validate invoice details structure
-        if "invoices_details" in customer and isinstance(customer["invoices_details"], list):
-            for inv_idx, invoice in enumerate(customer["invoices_details"]):
-                inv_prefix = f"{prefix}, Invoice {inv_idx}"
-                required_invoice_fields = [
-                    "invoice_number", "invoice_generated_date", "invoice_due_date",
-                    "days_past_due", "client_name", "project_name", "milestone",
-                    "invoice_amount", "payment_status", "outstanding_amount", "currency"
+                    out += [
+                        f"{pad}nested = customer.get({field!r}, _MISSING)",
+                        f"{pad}if nested is _MISSING:",
+                        f"{pad}    errors.append(('missing_object', idx, {field!r}))",
+                        f"{pad}else:",
+                    ]
+                inner = pad if all_present else pad + "    "
+                out.append(f"{inner}all_nested = type(nested) is dict and nested.keys() >= {nested_required}")
+                for key in prop["required"]:
+                    sub_required = prop["properties"][key]["required"]
+                    missing_any = " or ".join(f"{k!r} not in nested[{key!r}]" for k in sub_required)
+                    out += [
+                        f"{inner}if not all_nested and {key!r} not in nested:",
+                        f"{inner}    errors.append(('missing_bucket', idx, {field!r}, {key!r}))",
+                        f"{inner}elif {missing_any}:",
+                        f"{inner}    errors.append(('incomplete_bucket', idx, {key!r}, {' or '.join(repr(k) for k in sub_required)!r}))",
+                    ]
+                continue
+            mismatch = _TYPE_MISMATCH[prop["type"]]
+            type_error = f"{pad}    errors.append(('bad_type', idx, {field!r}, {_TYPE_TEXT[prop['type']]!r}))"
+            if all_present:
+                out += [f"{pad}if {mismatch.format(f'customer[{field!r}]')}:", type_error]
+            else:
+                out += [
+                    f"{pad}value = customer.get({field!r}, _MISSING)",
+                    f"{pad}if value is _MISSING:",
+                    f"{pad}    errors.append(('missing_field', idx, {field!r}))",
+                    f"{pad}elif {mismatch.format('value')}:",
+                    type_error,
                 ]
-                for field in required_invoice_fields:
-                    if field not in invoice:
-                        errors.append(f"{inv_prefix}: Missing field '{field}'")
+        return out
+
+    # One C-level keys() superset test picks the path; the per-field membership
+    # probes only run for customers that are actually missing something
+    lines.append(f"        if customer.keys() >= {required_set(customer['required'])}:")
+    lines += field_checks(12, all_present=True)
+    lines.append("        else:")
+    lines += field_checks(12, all_present=False)
+    # Array items (invoices_details) are checked after all customer-level fields
+    for field, prop in customer["properties"].items():
+        if "items" not in prop:
+            continue
+        items = prop["items"]
+        lines += [
+            f"        items = customer.get({field!r})",
+            "        if type(items) is list:",
+            "            for item_idx, item in enumerate(items):",
+            f"                if type(item) is dict and item.keys() >= {required_set(items['required'])}:",
+            "                    continue",
+        ]
+        for key in items["required"]:
+            lines += [
+                f"                if {key!r} not in item:",
+                f"                    errors.append(('missing_item_field', idx, item_idx, {key!r}))",
+            ]
+    lines.append("    return errors")
+
+    def fail_fast(source):
+        # Pass/fail variant: the first error returns False, so no records are ever built
+        out = []
+        for line in source:
+            stripped = line.lstrip()
+            pad = line[:len(line) - len(stripped)]
+            if stripped == "errors = []":
+                continue
+            if stripped.startswith("errors.append("):
+                out.append(pad + "return False")
+            elif stripped == "return errors":
+                # Early returns directly follow an append that now returns; only the final one stays
+                if pad == "    ":
+                    out.append("    return True")
+            else:
+                out.append(line)
+        return out
+
+    fast_lines = fail_fast(lines)
+    fast_lines[0] = "def fast_validate(response_data):"
+    source = "\n".join(lines + fast_lines)
+    exec(compile(source, "<billing_response_validator>", "exec"), namespace)
+    return namespace["validate"], namespace["fast_validate"]
+
+
+# Compiled once at import; every call below reuses these functions
+_COMPILED_VALIDATOR, _COMPILED_FAST_VALIDATOR = _compile_validator()
+
+
+def validate_billing_response(response_data):
+    """
+    Validate the billing analysis response structure.
+    Returns a list of (code, *args) error records, empty when the response is valid;
+    pass it to format_errors() for readable messages.
+    """
+    return _COMPILED_VALIDATOR(response_data)
+
+
+def fast_validate(response_data):
+    """
+    Return True if the response is valid. Stops at the first problem without
+    recording it; use validate_billing_response to find out what is wrong.
+    """
+    return _COMPILED_FAST_VALIDATOR(response_data)
+
+
+# JSON decoding: orjson when it is installed, the stdlib otherwise. orjson is optional;
+# without it everything below runs on json alone.
+try:
+    import orjson
+
+    _loads = orjson.loads
+    _dumps = orjson.dumps
+except ImportError:
+    orjson = None
+    _loads = json.loads
+
+    def _dumps(value):
+        return json.dumps(value).encode()
+
+
+def validate_billing_response_json(raw):
+    """
+    Decode a raw JSON response (bytes or str) once and validate the result in place.
+    Returns error records like validate_billing_response.
+    """
+    return validate_billing_response(_loads(raw))
+
 
-    return errors
+# Message templates for the error records, filled in by format_errors only when printing
+_ERROR_MESSAGES = {
+    "response_not_dict": "Response must be a dictionary",
+    "missing_results": "Response must contain 'results' key",
+    "results_not_list": "'results' must be a list",
+    "missing_field": "Customer {0}: Missing field {1!r}",
+    "bad_type": "Customer {0}: Field {1!r} must be {2}",
+    "missing_object": "Customer {0}: Missing {1!r}",
+    "missing_bucket": "Customer {0}: Missing bucket {2!r} in {1}",
+    "incomplete_bucket": "Customer {0}: Bucket {1!r} missing {2}",
+    "missing_item_field": "Customer {0}, Invoice {1}: Missing field {2!r}",
+    "inconsistent_totals": "Customer {0}: {1}",
+}
+
+
+def format_errors(errors):
+    """Render validate_billing_response error records as messages."""
+    return [_ERROR_MESSAGES[code].format(*args) for code, *args in errors]
+
+
+# Cross-field checks run by validate_billing_response_bulk once a response is structurally valid.
+# Each is (description, mask function over the numeric matrix columns below).
+_INVARIANT_FIELDS = (
+    "total_invoices", "overdue_invoice_count", "total_invoice_amount", "total_received",
+    "total_receivable", "total_overdue_amount"
+)
+_OVERDUE_BUCKET_NAMES = _REQUIRED_BUCKETS[1:]
+_TOTALS_TOLERANCE = 0.01
+_INVARIANTS = (
+    ("overdue invoice count exceeds total invoices", lambda col: col["overdue_invoice_count"] > col["total_invoices"]),
+    # One-sided: overpaid invoices have their receivable clamped to 0, so received + receivable may exceed the total
+    ("received plus receivable is less than total invoice amount",
+     lambda col: col["total_received"] + col["total_receivable"] < col["total_invoice_amount"] - _TOTALS_TOLERANCE),
+    ("overdue amount exceeds total receivable",
+     lambda col: col["total_overdue_amount"] > col["total_receivable"] + _TOTALS_TOLERANCE),
+    ("overdue bucket counts do not sum to overdue_invoice_count",
+     lambda col: col["bucket_counts"] != col["overdue_invoice_count"]),
+    ("overdue bucket amounts do not sum to total_overdue_amount",
+     lambda col: np.abs(col["bucket_amounts"] - col["total_overdue_amount"]) > _TOTALS_TOLERANCE),
+)
+
+
+def check_numeric_invariants(customers):
+    """
+    Vectorized cross-field checks over structurally valid customer results.
+    Returns a (len(customers), len(_INVARIANTS)) bool array, True where a check fails.
+    """
+    width = len(_INVARIANT_FIELDS) + 2 * len(_OVERDUE_BUCKET_NAMES)
+    values = np.fromiter(
+        chain.from_iterable(
+            chain(
+                (customer[field] for field in _INVARIANT_FIELDS),
+                (customer["overdue_buckets"][bucket]["count"] for bucket in _OVERDUE_BUCKET_NAMES),
+                (customer["overdue_buckets"][bucket]["amount"] for bucket in _OVERDUE_BUCKET_NAMES),
+            )
+            for customer in customers
+        ),
+        dtype=np.float64,
+        count=len(customers) * width,
+    ).reshape(len(customers), width)
+    col = {field: values[:, i] for i, field in enumerate(_INVARIANT_FIELDS)}
+    counts_start = len(_INVARIANT_FIELDS)
+    amounts_start = counts_start + len(_OVERDUE_BUCKET_NAMES)
+    col["bucket_counts"] = values[:, counts_start:amounts_start].sum(axis=1)
+    col["bucket_amounts"] = values[:, amounts_start:].sum(axis=1)
+    return np.column_stack([check(col) for _, check in _INVARIANTS])
+
+
+def validate_billing_response_bulk(responses):
+    """
+    Validate a batch of responses: structural checks per response, then one vectorized
+    numeric invariant pass over the customers of every structurally valid response.
+    Returns one error record list per response, as validate_billing_response does.
+    """
+    all_errors = [validate_billing_response(response) for response in responses]
+    checked = [(errors, response["results"]) for errors, response in zip(all_errors, responses) if not errors]
+    customers = [customer for _, results in checked for customer in results]
+    if not customers:
+        return all_errors
+
+    failed = check_numeric_invariants(customers)
+    row = 0
+    for errors, results in checked:
+        for idx in range(len(results)):
+            for check_idx in np.flatnonzero(failed[row]):
+                errors.append(("inconsistent_totals", idx, _INVARIANTS[check_idx][0]))
+            row += 1
+    return all_errors
+
+
+# Sample response shared by every test run instead of being rebuilt per call; treat it as read-only
+_SAMPLE_RESPONSE = {
+    "results": [
+        {
+            "customer_id": "353",
+            "customer_name": "Test Customer",
+            "total_invoices": 5,
+            "total_invoice_amount": 25000.0,
+            "total_received": 25000.0,
+            "total_receivable": 0.0,
+            "total_overdue_amount": 0.0,
+            "overdue_invoice_count": 0,
+            "client_score": 0.885,
+            "sentiment_score": 0.6645,
+            "risk_level": "Low",
+            "key_factors": ["Test factor"],
+            "recommendations": ["Test recommendation"],
+            "analysis_summary": "Test summary",
+            "overdue_buckets": {
+                "Upcoming": {"count": 0, "amount": 0.0},
+                "0-30 days": {"count": 0, "amount": 0.0},
+                "31-60 days": {"count": 0, "amount": 0.0},
+                "61-90 days": {"count": 0, "amount": 0.0},
+                "90+ days": {"count": 0, "amount": 0.0}
+            },
+            "invoices_details": [
+                {
+                    "invoice_number": "INV-001",
+                    "invoice_generated_date": "2024-01-01",
+                    "invoice_due_date": "2024-02-01",
+                    "days_past_due": 0,
+                    "client_name": "Test Customer",
+                    "project_name": "Test Project",
+                    "milestone": "Phase 1",
+                    "invoice_amount": 5000.0,
+                    "payment_status": "Paid",
+                    "payment_received_date": "2024-01-15",
+                    "outstanding_amount": 0.0,
+                    "currency": "USD"
+                }
+            ],
+            "paid_on_time_count": 5,
+            "paid_late_count": 0,
+            "upcoming_invoice_count": 0,
+            "upcoming_invoice_amount": 0.0,
+            "partial_paid_on_time_count": 0,
+            "partial_paid_late_count": 0,
+            "disputed_invoice_count": 0,
+            "recurring_delay_count": 0,
+            "overdue_percentage": 0.0,
+            "overdue_percentage_amount": 0.0,
+            "overdue_percentage_count": 0.0,
+            "max_overdue_days": 0,
+            "overdue_amount_percentile_25": 0.0,
+            "overdue_amount_median": 0.0,
+            "overdue_amount_percentile_75": 0.0,
+            "avg_overdue_days": 0.0,
+            "total_past_invoices": 5,
+            "on_time_payment_ratio": 1.0,
+            "late_payment_ratio": 0.0,
+            "recurring_delay_ratio": 0.0,
+            "next_upcoming_payment_date": None,
+            "last_invoice_date": "2024-05-01",
+            "last_payment_date": "2024-05-15",
+            "sentiment_score_from_comm": 0.5
+        }
+    ]
+}
 
 
 def test_sample_response():
     """Test with a sample response structure."""
 
-    sample_response = {
-        "results": [
-            {
-                "customer_id": "353",
-                "customer_name": "Test Customer",
-                "total_invoices": 5,
-                "total_invoice_amount": 25000.0,
-                "total_received": 25000.0,
-                "total_receivable": 0.0,
-                "total_overdue_amount": 0.0,
-                "overdue_invoice_count": 0,
-                "client_score": 0.885,
-                "sentiment_score": 0.6645,
-                "risk_level": "Low",
-                "key_factors": ["Test factor"],
-                "recommendations": ["Test recommendation"],
-                "analysis_summary": "Test summary",
-                "overdue_buckets": {
-                    "Upcoming": {"count": 0, "amount": 0.0},
-                    "0-30 days": {"count": 0, "amount": 0.0},
-                    "31-60 days": {"count": 0, "amount": 0.0},
-                    "61-90 days": {"count": 0, "amount": 0.0},
-                    "90+ days": {"count": 0, "amount": 0.0}
-                },
-                "invoices_details": [
-                    {
-                        "invoice_number": "INV-001",
-                        "invoice_generated_date": "2024-01-01",
-                        "invoice_due_date": "2024-02-01",
-                        "days_past_due": 0,
-                        "client_name": "Test Customer",
-                        "project_name": "Test Project",
-                        "milestone": "Phase 1",
-                        "invoice_amount": 5000.0,
-                        "payment_status": "Paid",
-                        "payment_received_date": "2024-01-15",
-                        "outstanding_amount": 0.0,
-                        "currency": "USD"
-                    }
-                ],
-                "paid_on_time_count": 5,
-                "paid_late_count": 0,
-                "upcoming_invoice_count": 0,
-                "upcoming_invoice_amount": 0.0,
-                "partial_paid_on_time_count": 0,
-                "partial_paid_late_count": 0,
-                "disputed_invoice_count": 0,
-                "recurring_delay_count": 0,
-                "overdue_percentage": 0.0,
-                "overdue_percentage_amount": 0.0,
-                "overdue_percentage_count": 0.0,
-                "max_overdue_days": 0,
-                "overdue_amount_percentile_25": 0.0,
-                "overdue_amount_median": 0.0,
-                "overdue_amount_percentile_75": 0.0,
-                "avg_overdue_days": 0.0,
-                "total_past_invoices": 5,
-                "on_time_payment_ratio": 1.0,
-                "late_payment_ratio": 0.0,
-                "recurring_delay_ratio": 0.0,
-                "next_upcoming_payment_date": None,
-                "last_invoice_date": "2024-05-01",
-                "last_payment_date": "2024-05-15",
-                "sentiment_score_from_comm": 0.5
-            }
-        ]
-    }
+    sample_response = _SAMPLE_RESPONSE
 
     errors = validate_billing_response(sample_response)
 
     if errors:
-        print("❌ Validation FAILED:")
-        for error in errors:
-            print(f"  - {error}")
-        return False
+        # One write for the whole report instead of a print per error
+        sys.stdout.write("❌ Validation FAILED:\n" + "".join(f"  - {error}\n" for error in format_errors(errors)))
     else:
         print("✅ Validation PASSED: Response structure is correct!")
         print(f"   Validated {len(sample_response['results'])} customer record(s)")
-        return True
+    assert errors == []
+    assert fast_validate(sample_response) is True
+
+
+def _invalid_responses():
+    """Copies of the sample response, each broken in one way the validator checks."""
+    yield None
+    yield {}
+    yield {"results": {}}
+    for mutate in (
+        lambda customer: customer.pop("risk_level"),
+        lambda customer: customer.update(client_score="0.9"),
+        lambda customer: customer.update(key_factors=("Test factor",)),
+        lambda customer: customer.pop("overdue_buckets"),
+        lambda customer: customer["overdue_buckets"].pop("61-90 days"),
+        lambda customer: customer["overdue_buckets"]["90+ days"].pop("amount"),
+        lambda customer: customer["invoices_details"][0].pop("currency"),
+    ):
+        response = copy.deepcopy(_SAMPLE_RESPONSE)
+        mutate(response["results"][0])
+        yield response
+
+
+def test_validators_agree_on_invalid_responses():
+    """fast_validate rejects every response that validate_billing_response reports errors for."""
+    for response in _invalid_responses():
+        assert validate_billing_response(response)
+        assert fast_validate(response) is False
+    response = copy.deepcopy(_SAMPLE_RESPONSE)
+    del response["results"][0]["risk_level"]
+    assert validate_billing_response(response) == [("missing_field", 0, "risk_level")]
+
+
+def test_bulk_numeric_invariants():
+    """Invariant failures are reported against the right response and customer; invalid responses are skipped."""
+    customer = _SAMPLE_RESPONSE["results"][0]
+    bad_counts = copy.deepcopy(customer)
+    bad_counts["overdue_invoice_count"] = 2
+    bad_totals = copy.deepcopy(customer)
+    bad_totals["total_received"] = 20000.0
+
+    errors = validate_billing_response_bulk([
+        _SAMPLE_RESPONSE,
+        {"results": [customer, bad_counts]},
+        {"results": [{}]},
+        {"results": [bad_totals]},
+    ])
+
+    assert errors[0] == []
+    assert errors[1] == [("inconsistent_totals", 1, "overdue bucket counts do not sum to overdue_invoice_count")]
+    assert errors[2] and all(code != "inconsistent_totals" for code, *_ in errors[2])
+    assert errors[3] == [("inconsistent_totals", 0, "received plus receivable is less than total invoice amount")]
+
+
+def test_bulk_numeric_invariants_overpaid_customer():
+    """An overpaid invoice is not reported: calculate_client_metrics clamps its receivable to 0."""
+    # Totals as calculate_client_metrics reports them for a 1000 invoice paid at 1200
+    # plus an unpaid 500 invoice that is not yet due
+    overpaid = copy.deepcopy(_SAMPLE_RESPONSE["results"][0])
+    overpaid.update(
+        total_invoices=2, total_invoice_amount=1500.0, total_received=1200.0, total_receivable=500.0,
+        total_overdue_amount=0.0, overdue_invoice_count=0,
+    )
+    response = {"results": [overpaid]}
+
+    assert validate_billing_response(response) == []
+    assert validate_billing_response_bulk([response]) == [[]]
+
+
+def test_validate_billing_response_json():
+    """The sample response validates after a round trip through its JSON encoding, as bytes or str."""
+    raw = _dumps(_SAMPLE_RESPONSE)
+    assert _loads(raw) == _SAMPLE_RESPONSE
+    assert validate_billing_response_json(raw) == []
+    assert validate_billing_response_json(raw.decode()) == []
+    assert validate_billing_response_json(b'{"data": []}') == [("missing_results",)]
+
+
+def compare_json_decoders(number=2000):
+    """
+    Print the time to decode and validate the sample response with json.loads and, if installed,
+    orjson.loads. Run with `python test_billing_analysis.py --bench`.
+    """
+    import timeit
+
+    raw = _dumps(_SAMPLE_RESPONSE)
+    decoders = [("json.loads", json.loads)] + ([("orjson.loads", orjson.loads)] if orjson else [])
+    for label, loads in decoders:
+        seconds = min(timeit.repeat(lambda: validate_billing_response(loads(raw)), number=number, repeat=5))
+        print(f"   {label:<12} + validate: {seconds / number * 1e6:.1f} µs per response")
 
 
 if __name__ == "__main__":
@@ -175,7 +508,16 @@ if __name__ == "__main__":
     print("=" * 60)
     print()
 
-    success = test_sample_response()
+    try:
+        test_sample_response()
+        success = True
+    except AssertionError:
+        success = False
+
+    # Decoder timings are a benchmark, not a test; only run them when asked
+    if "--bench" in sys.argv[1:]:
+        print()
+        compare_json_decoders()
 
     print()
     print("=" * 60)